@@ -0,0 +1,108 @@
+import numpy as np
+from config import (
+    SAMPLE_RATE, GATE_RMS_DB, GATE_NOISE_RMS_DB, GATE_FLUX_DB, GATE_ZCR, GATE_MIN_CONFIDENCE,
+    ONSET_RISE_DB, ONSET_MIN_DB, ONSET_FLOOR_SECONDS
+)
+
+EPS = 1e-10
+
+
+class SilenceGate:
+    """
+    Cheap vectorized check in front of the cry model.
+    Splits the segment into frames and measures RMS level, spectral flux and
+    zero-crossing rate. Noise-like frames (high ZCR, e.g. a fan) are allowed
+    a higher level than voiced ones. When every frame stays under its
+    threshold with enough margin, the gate answers `label` itself and the
+    MFCC extraction and model call are skipped.
+    """
+    def __init__(self, rms_db=GATE_RMS_DB, noise_rms_db=GATE_NOISE_RMS_DB, flux_db=GATE_FLUX_DB,
+                 zcr=GATE_ZCR, min_confidence=GATE_MIN_CONFIDENCE, frame_length=1024, label="silence"):
+        self.rms_db = rms_db
+        self.noise_rms_db = noise_rms_db
+        self.flux_db = flux_db
+        self.zcr = zcr
+        self.min_confidence = min_confidence
+        self.frame_length = frame_length
+        self.label = label
+        self.window = np.hanning(frame_length).astype(np.float32)
+        self.checked = 0
+        self.skipped = 0
+
+    def measure(self, audio):
+        """Per-frame (rms_db, flux_db, zcr) arrays for a mono segment."""
+        n = len(audio) // self.frame_length
+        frames = np.asarray(audio[:n * self.frame_length], dtype=np.float32).reshape(n, self.frame_length)
+        rms_db = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + EPS)
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        spectra = np.abs(np.fft.rfft(frames * self.window, axis=1)) / self.frame_length
+        flux = np.sum(np.maximum(np.diff(spectra, axis=0), 0.0), axis=1)
+        flux_db = 20 * np.log10(np.concatenate(([0.0], flux)) + EPS)
+        return rms_db, flux_db, zcr
+
+    def check(self, audio):
+        """Returns (label, confidence) when the segment is confidently quiet, otherwise None."""
+        self.checked += 1
+        if len(audio) < 2 * self.frame_length:
+            return None
+
+        rms_db, flux_db, zcr = self.measure(audio)
+        thresholds = np.where(zcr > self.zcr, self.noise_rms_db, self.rms_db)
+        # Margin in dB by which the loudest frame / strongest onset stays under its threshold
+        margin = min(np.min(thresholds - rms_db), self.flux_db - np.max(flux_db))
+        confidence = float(np.clip(0.5 + margin / 40.0, 0.0, 0.99))
+        if margin <= 0 or confidence < self.min_confidence:
+            return None
+
+        self.skipped += 1
+        return self.label, confidence
+
+    def stats(self):
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / self.checked if self.checked else 0.0,
+        }
+
+
+class OnsetDetector:
+    """
+    Energy onset detector for audio as it arrives, cheap enough to run on
+    every new block. Tracks a noise floor of frame levels that falls quickly
+    and rises over `floor_seconds`, and reports an onset when a frame rises
+    `rise_db` above it (and above `min_db`). Only the rising edge counts, so
+    sustained crying reports one onset rather than one per block.
+    """
+    def __init__(self, rise_db=ONSET_RISE_DB, min_db=ONSET_MIN_DB, floor_seconds=ONSET_FLOOR_SECONDS,
+                 frame_length=512, sr=SAMPLE_RATE):
+        self.rise_db = rise_db
+        self.min_db = min_db
+        self.frame_length = frame_length
+        self.rise_rate = min(1.0, frame_length / (floor_seconds * sr))  # Per-frame EMA weight when louder
+        self.floor = None
+        self.active = False
+        self.onsets = 0
+        self._tail = np.empty(0, dtype=np.float32)
+
+    def update(self, samples):
+        """Feeds newly written samples. Returns True if an onset starts in them."""
+        samples = np.concatenate((self._tail, np.asarray(samples, dtype=np.float32)))
+        n = len(samples) // self.frame_length
+        self._tail = samples[n * self.frame_length:]
+        if n == 0:
+            return False
+
+        frames = samples[:n * self.frame_length].reshape(n, self.frame_length)
+        levels = 10 * np.log10(np.mean(frames ** 2, axis=1) + EPS)
+        onset = False
+        for level in levels:
+            if self.floor is None:
+                self.floor = level
+                continue
+            loud = level > self.floor + self.rise_db and level > self.min_db
+            if loud and not self.active:
+                onset = True
+                self.onsets += 1
+            self.active = loud
+            self.floor += (self.rise_rate if level > self.floor else 0.5) * (level - self.floor)
+        return onset
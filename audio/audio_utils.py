@@ -1,10 +1,17 @@
+import threading
 import numpy as np
-from collections import deque
 
 class AudioBuffer:
     def __init__(self, max_len):
-        # Initialize a thread-safe deque with a fixed maximum length
-        self.buffer = deque(maxlen=int(max_len))
+        # Preallocated float32 ring buffer; the audio callback writes whole blocks into it
+        self.max_len = int(max_len)
+        self.buffer = np.zeros(self.max_len, dtype=np.float32)
+        self.write_pos = 0        # Next index in the ring to be written
+        self.total_samples = 0    # Monotonic count of every sample ever written
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total_samples, self.max_len)
 
     def callback(self, indata, frames, time_info, status):
         """
@@ -13,12 +20,59 @@ class AudioBuffer:
         """
         if status:
             print(f"⚠️ Audio Status: {status}")
-        
+
         # indata is shape (frames, channels), we only need channel 0
-        self.buffer.extend(indata[:, 0])
+        self.write(indata[:, 0])
+
+    def write(self, samples):
+        """Appends a block of samples with at most two vectorized slice assignments."""
+        samples = np.asarray(samples, dtype=np.float32)
+        n = len(samples)
+        if n == 0:
+            return
+
+        with self.lock:
+            if n >= self.max_len:
+                # Block is larger than the ring: only its tail survives
+                self.buffer[:] = samples[-self.max_len:]
+                self.write_pos = 0
+            else:
+                end = self.write_pos + n
+                if end <= self.max_len:
+                    self.buffer[self.write_pos:end] = samples
+                else:
+                    first = self.max_len - self.write_pos
+                    self.buffer[self.write_pos:] = samples[:first]
+                    self.buffer[:n - first] = samples[first:]
+                self.write_pos = end % self.max_len
+            self.total_samples += n
+
+    def _copy_last(self, count):
+        """Copies the newest `count` samples into one contiguous array. Caller holds the lock."""
+        if count <= 0:
+            return np.empty(0, dtype=np.float32)
+        start = (self.write_pos - count) % self.max_len
+        if start + count <= self.max_len:
+            return self.buffer[start:start + count].copy()
+        return np.concatenate((self.buffer[start:], self.buffer[:self.write_pos]))
+
+    def snapshot(self):
+        """Returns (segment, end_position) where end_position is the sample counter after the segment."""
+        with self.lock:
+            return self._copy_last(len(self)), self.total_samples
 
     def get_audio_segment(self):
         """
-        Returns the current buffer as a numpy array.
+        Returns the current buffer as a numpy array (oldest sample first).
+        """
+        return self.snapshot()[0]
+
+    def get_samples_since(self, position):
+        """
+        Returns (samples, end_position) for audio written after `position`.
+        Only the new samples are copied; if `position` has already been
+        overwritten, the retained part of the ring is returned instead.
         """
-        return np.array(self.buffer)
\ No newline at end of file
+        with self.lock:
+            count = min(self.total_samples - int(position), len(self))
+            return self._copy_last(count), self.total_samples
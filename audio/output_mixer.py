@@ -0,0 +1,269 @@
+import threading
+import numpy as np
+import librosa
+
+
+class Source:
+    """
+    Something the OutputMixer pulls audio from, one block at a time.
+    `bus` groups sources for ducking ("voice", "music", "noise").
+    """
+    def __init__(self, channels, bus, gain=1.0, fade_in_frames=0):
+        self.channels = channels
+        self.bus = bus
+        self.gain = gain
+        self.done = False
+        self.finished = threading.Event()
+        self._fade_in = fade_in_frames
+        self._fade_out = None        # (frames_left, total) while fading out
+        self._played = 0
+
+    def _render(self, frames):
+        """Returns up to `frames` float32 frames shaped (n, channels); fewer means the source ended."""
+        raise NotImplementedError
+
+    def remaining(self):
+        """Frames left to play, or None when the source does not end on its own."""
+        return None
+
+    def fade_out(self, frames):
+        """Ramps the source down over `frames` and ends it."""
+        if frames <= 0:
+            self.stop()
+        elif self._fade_out is None:
+            self._fade_out = (frames, frames)
+
+    def stop(self):
+        self.done = True
+        self.finished.set()
+
+    def read(self, frames):
+        if self.done:
+            return None
+        block = self._render(frames)
+        n = len(block)
+        envelope = np.full(n, self.gain, dtype=np.float32)
+        if self._played < self._fade_in:
+            ramp = (self._played + np.arange(n)) / self._fade_in
+            envelope *= np.minimum(ramp, 1.0)
+        if self._fade_out is not None:
+            left, total = self._fade_out
+            ramp = (left - np.arange(n)) / total
+            envelope *= np.clip(ramp, 0.0, 1.0)
+            self._fade_out = (left - n, total)
+            if left - n <= 0:
+                self.stop()
+        self._played += len(block)
+        if len(block) < frames:
+            self.stop()
+        return block * envelope[:, None]
+
+
+class BufferSource(Source):
+    """Plays an in-memory array: float32 in [-1, 1] or int16 PCM (e.g. a memory-mapped cache file)."""
+    def __init__(self, data, channels, bus="music", gain=1.0, fade_in_frames=0, loop=False):
+        super().__init__(channels, bus, gain, fade_in_frames)
+        data = np.asarray(data)  # no copy, so memory-mapped PCM is paged in block by block
+        self.data = data.reshape(-1, 1) if data.ndim == 1 else data
+        self.scale = 1.0 / 32768.0 if self.data.dtype == np.int16 else 1.0
+        self.loop = loop
+        self.position = 0
+
+    def _render(self, frames):
+        if self.loop and len(self.data):
+            chunk = self.data[(self.position + np.arange(frames)) % len(self.data)]
+            self.position = (self.position + frames) % len(self.data)
+        else:
+            chunk = self.data[self.position:self.position + frames]
+            self.position += len(chunk)
+        block = chunk.astype(np.float32) * self.scale
+        if block.shape[1] != self.channels:
+            block = np.repeat(block[:, :1], self.channels, axis=1)
+        return block
+
+    def remaining(self):
+        return None if self.loop else max(0, len(self.data) - self.position)
+
+
+class QueueSource(Source):
+    """Audio appended while it plays (e.g. TTS sentences); ends once finish() was called and it drained."""
+    def __init__(self, channels, bus="voice", gain=1.0, fade_in_frames=0):
+        super().__init__(channels, bus, gain, fade_in_frames)
+        self._chunks = []
+        self._offset = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def append(self, data):
+        data = np.asarray(data, dtype=np.float32)
+        data = data.reshape(-1, 1) if data.ndim == 1 else data
+        if data.shape[1] != self.channels:
+            data = np.repeat(data[:, :1], self.channels, axis=1)
+        with self._lock:
+            self._chunks.append(data)
+
+    def finish(self):
+        self._closed = True
+
+    def remaining(self):
+        with self._lock:
+            return sum(len(chunk) for chunk in self._chunks) - self._offset
+
+    def _render(self, frames):
+        out = np.zeros((frames, self.channels), dtype=np.float32)
+        filled = 0
+        with self._lock:
+            while filled < frames and self._chunks:
+                chunk = self._chunks[0]
+                take = min(frames - filled, len(chunk) - self._offset)
+                out[filled:filled + take] = chunk[self._offset:self._offset + take]
+                filled += take
+                self._offset += take
+                if self._offset >= len(chunk):
+                    self._chunks.pop(0)
+                    self._offset = 0
+            drained = not self._chunks
+        if drained and self._closed:
+            return out[:filled]
+        # Still waiting for the next chunk: pad with silence instead of ending
+        return out
+
+
+class WhiteNoiseSource(Source):
+    """Endless white noise at a fixed RMS level (dBFS)."""
+    def __init__(self, channels, level_db=-30.0, bus="noise", fade_in_frames=0, seed=None):
+        super().__init__(channels, bus, 10 ** (level_db / 20.0), fade_in_frames)
+        self.rng = np.random.default_rng(seed)
+
+    def _render(self, frames):
+        return self.rng.standard_normal((frames, self.channels)).astype(np.float32)
+
+
+class OutputMixer:
+    """
+    One low-latency sounddevice output stream with a fixed block size that
+    sums every active source. While any "voice" source plays, the "music" bus
+    is ducked smoothly. Sources can be added and removed from any thread: the
+    audio callback only reads an immutable snapshot of the source list.
+    """
+    def __init__(self, sample_rate=44100, channels=2, blocksize=512, duck_gain=0.3, duck_ms=250, device=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.duck_gain = duck_gain
+        # Per-block gain step so a full duck takes about duck_ms
+        self.duck_step = (1.0 - duck_gain) * blocksize / (sample_rate * duck_ms / 1000.0)
+        self._duck = 1.0
+        self._sources = ()
+        self._lock = threading.Lock()
+        self.device = device  # sounddevice output device, None for the default
+        self.stream = None
+        self.closed = False
+        self.underflows = 0
+
+    def start(self):
+        import sounddevice as sd  # Only needed once a device is opened, not by simulation or tooling
+
+        self.stream = sd.OutputStream(
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            device=self.device,
+            dtype="float32",
+            blocksize=self.blocksize,
+            latency="low",
+            callback=self._callback
+        )
+        self.stream.start()
+        print(f"🔊 Output mixer running ({self.sample_rate} Hz, block {self.blocksize})")
+        return self
+
+    def close(self):
+        """Stops the stream and ends every source, releasing anyone waiting for one to finish."""
+        self.closed = True
+        if self.stream:
+            try:
+                self.stream.stop()
+                self.stream.close()
+            finally:
+                self.stream = None
+        with self._lock:
+            sources, self._sources = self._sources, ()
+        for source in sources:
+            source.stop()
+
+    def frames(self, seconds):
+        return int(seconds * self.sample_rate)
+
+    def add(self, source):
+        if self.closed:
+            source.stop()  # Nothing will ever read it
+            return source
+        with self._lock:
+            self._sources = self._sources + (source,)
+        return source
+
+    def wait(self, source, margin=2.0):
+        """
+        Blocks until `source` finished playing, for at most its remaining
+        duration plus `margin` seconds, so a stalled stream cannot hang the
+        caller. A source that overruns is removed. Returns True if it finished.
+        """
+        remaining = source.remaining()
+        timeout = None if remaining is None else remaining / self.sample_rate + margin
+        if source.finished.wait(timeout):
+            return True
+        print("⚠️ Output stream stalled; abandoning playback")
+        self.remove(source)
+        return False
+
+    def remove(self, source):
+        source.stop()
+        with self._lock:
+            self._sources = tuple(s for s in self._sources if s is not source)
+
+    def play(self, wav, sr, bus="voice", gain=1.0, fade_in_ms=0, loop=False):
+        """Resamples an in-memory waveform to the mixer rate and starts it. Returns the source."""
+        wav = np.asarray(wav, dtype=np.float32)
+        if sr != self.sample_rate:
+            wav = librosa.resample(wav, orig_sr=sr, target_sr=self.sample_rate, axis=0)
+        fade_in = self.frames(fade_in_ms / 1000.0)
+        return self.add(BufferSource(wav, self.channels, bus, gain, fade_in, loop))
+
+    def is_active(self, bus):
+        return any(s.bus == bus and not s.done for s in self._sources)
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.underflows += 1
+        sources = self._sources
+        out = np.zeros((frames, self.channels), dtype=np.float32)
+
+        target = self.duck_gain if any(s.bus == "voice" and not s.done for s in sources) else 1.0
+        step = self.duck_step * frames / self.blocksize
+        start_duck = self._duck
+        self._duck = min(start_duck + step, target) if target > start_duck else max(start_duck - step, target)
+        duck_ramp = np.linspace(start_duck, self._duck, frames, dtype=np.float32)[:, None]
+
+        finished = False
+        for source in sources:
+            try:
+                block = source.read(frames)
+            except Exception:
+                source.stop()
+                block = None
+            if block is None:
+                finished = True
+                continue
+            if source.bus == "music":
+                block = block * duck_ramp[:len(block)]
+            out[:len(block)] += block
+            finished = finished or source.done
+
+        np.clip(out, -1.0, 1.0, out=outdata)
+
+        # Prune ended sources without ever blocking the audio thread
+        if finished and self._lock.acquire(blocking=False):
+            try:
+                self._sources = tuple(s for s in self._sources if not s.done)
+            finally:
+                self._lock.release()
@@ -0,0 +1,60 @@
+"""
+Deterministic synthetic audio at SAMPLE_RATE for benchmarks and simulations:
+pure tones, noise at a given level and cry-like harmonic bursts (a wobbling
+f0 with decaying harmonics under an on/off envelope). The same seed always
+yields the same samples.
+"""
+import numpy as np
+from config import SAMPLE_RATE
+
+
+def tone(duration, freq=440.0, level_db=-20.0, sr=SAMPLE_RATE):
+    t = np.arange(int(duration * sr)) / sr
+    return (10 ** (level_db / 20.0) * np.sqrt(2) * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def noise(duration, level_db=-40.0, seed=0, sr=SAMPLE_RATE):
+    rng = np.random.default_rng(seed)
+    return (10 ** (level_db / 20.0) * rng.standard_normal(int(duration * sr))).astype(np.float32)
+
+
+def cry_bursts(duration, seed=0, f0=450.0, harmonics=6, burst=0.8, pause=0.4, level_db=-12.0, sr=SAMPLE_RATE):
+    """Cry-like bursts: f0 with vibrato and pitch drift, 1/k harmonics, smooth attack and release."""
+    rng = np.random.default_rng(seed)
+    n = int(duration * sr)
+    t = np.arange(n) / sr
+    period = burst + pause
+    # Each burst gets its own pitch offset so consecutive bursts differ
+    burst_index = (t // period).astype(int)
+    offsets = rng.uniform(-60, 60, burst_index.max() + 1)
+    pitch = f0 + offsets[burst_index] + 25 * np.sin(2 * np.pi * 6 * t) + 40 * ((t % period) / burst)
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    voiced = sum(np.sin(k * phase) / k for k in range(1, harmonics + 1))
+
+    position = t % period
+    attack = np.clip(position / 0.05, 0, 1)
+    release = np.clip((burst - position) / 0.1, 0, 1)
+    envelope = np.where(position < burst, attack * release, 0.0)
+
+    signal = voiced * envelope
+    signal *= 10 ** (level_db / 20.0) / (np.sqrt(np.mean(signal ** 2)) + 1e-12)
+    return (signal + noise(duration, level_db - 35, seed + 1, sr)).astype(np.float32)
+
+
+def segment(kind, duration, seed=0):
+    """One of "silence", "noise", "tone" or "cry"."""
+    if kind == "silence":
+        return noise(duration, -70.0, seed)
+    if kind == "noise":
+        return noise(duration, -30.0, seed)
+    if kind == "tone":
+        return tone(duration) + noise(duration, -60.0, seed)
+    if kind == "cry":
+        return cry_bursts(duration, seed)
+    raise ValueError(f"Unknown segment kind: {kind}")
+
+
+def stream(duration, seed=0, kinds=("silence", "cry", "noise", "cry", "tone")):
+    """Concatenation of equal-length segments of each kind, like a few minutes of nursery audio."""
+    part = duration / len(kinds)
+    return np.concatenate([segment(kind, part, seed + i) for i, kind in enumerate(kinds)])
@@ -0,0 +1,326 @@
+"""
+Hot-path benchmark suite.
+
+Measures AudioBuffer throughput, MFCC extraction and cry-model latency, Q-agent
+choose/update/save rates (single calls, and the array backend's batch API) and
+WebSocket broadcast fan-out, all on deterministic
+synthetic audio. Results are written as JSON; with --baseline every metric is
+compared to a previous run and the exit code is 1 when one regressed by more
+than --threshold. Run from the repository root, e.g.:
+
+    python -m benchmarks.run --out benchmarks/results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.15
+"""
+import os
+import io
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import contextlib
+import numpy as np
+from config import SAMPLE_RATE, SEGMENT_SIZE, CATEGORIES, MAX_LEN, N_MFCC, CRY_MODEL_PATH
+from audio import synthetic as synthetic_audio
+
+BLOCK = 1024  # Frames per audio callback, as in SmartCradleSystem.start_audio_stream
+AGENT_BATCH = 256  # Transitions per choose_actions/update_batch call
+
+
+class Results:
+    """Named metrics with a unit and the direction that counts as better."""
+    def __init__(self):
+        self.metrics = {}
+        self.skipped = {}
+
+    def add(self, name, value, unit, higher_is_better):
+        self.metrics[name] = {"value": float(value), "unit": unit, "higher_is_better": higher_is_better}
+        arrow = "↑" if higher_is_better else "↓"
+        print(f"   {name:<44} {value:>14,.3f} {unit} {arrow}")
+
+    def add_latencies(self, name, samples):
+        """p50/p95/p99 in milliseconds from per-call durations in seconds."""
+        ms = np.asarray(samples) * 1000.0
+        for p in (50, 95, 99):
+            self.add(f"{name}.p{p}_ms", np.percentile(ms, p), "ms", False)
+
+    def skip(self, name, reason):
+        self.skipped[name] = reason
+        print(f"   {name:<44} skipped: {reason}")
+
+
+def timed_calls(fn, args_list, warmup=3):
+    """Runs fn(*args) for every args tuple; returns per-call durations in seconds."""
+    for args in args_list[:warmup]:
+        fn(*args)
+    durations = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences the emoji progress prints of the components under test."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_audio_buffer(results, scale):
+    from audio.audio_utils import AudioBuffer
+
+    audio = synthetic_audio.stream(60 * scale, seed=1)
+    blocks = [audio[i:i + BLOCK].reshape(-1, 1) for i in range(0, len(audio) - BLOCK + 1, BLOCK)]
+    buffer = AudioBuffer(SEGMENT_SIZE)
+
+    start = time.perf_counter()
+    for block in blocks:
+        buffer.callback(block, BLOCK, None, None)
+    elapsed = time.perf_counter() - start
+    results.add("audio_buffer.callback_realtime_factor", len(blocks) * BLOCK / SAMPLE_RATE / elapsed, "x", True)
+    results.add("audio_buffer.callback_us", elapsed / len(blocks) * 1e6, "us", False)
+
+    reads = 200 * scale
+    start = time.perf_counter()
+    for _ in range(reads):
+        buffer.get_audio_segment()
+    results.add("audio_buffer.get_audio_segment_per_s", reads / (time.perf_counter() - start), "calls/s", True)
+
+
+def _polls(scale, hop_seconds=1.0):
+    """(segment, end_position) pairs as the monitor loop sees them, one per poll."""
+    audio = synthetic_audio.stream(SEGMENT_SIZE / SAMPLE_RATE + 40 * scale, seed=2)
+    step = int(hop_seconds * SAMPLE_RATE) // BLOCK * BLOCK
+    ends = range(SEGMENT_SIZE // BLOCK * BLOCK + BLOCK, len(audio), step)
+    return [(audio[end - SEGMENT_SIZE:end], end) for end in ends]
+
+
+def bench_features(results, scale):
+    from cry_model.features import extract_mfcc, StreamingMFCC
+
+    polls = _polls(scale)
+    results.add_latencies("features.batch_mfcc", timed_calls(extract_mfcc, [(s,) for s, _ in polls]))
+    extractor = StreamingMFCC()
+    results.add_latencies("features.streaming_mfcc", timed_calls(extractor.extract, polls))
+
+
+def _stand_in_model(path):
+    """Tiny LSTM with the production input/output shapes, for when the real .h5 is absent."""
+    import tensorflow as tf
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(MAX_LEN, N_MFCC)),
+        tf.keras.layers.LSTM(32),
+        tf.keras.layers.Dense(len(CATEGORIES), activation="softmax"),
+    ])
+    model.save(path)
+    return path
+
+
+def bench_predict(results, scale, backends=("keras", "compiled")):
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        results.skip("predict", "tensorflow is not installed")
+        return
+    from cry_model.cry_classifier import CryClassifier
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = CRY_MODEL_PATH
+        if not os.path.exists(model_path):
+            model_path = _stand_in_model(os.path.join(tmp, "stand_in.h5"))
+            print("   (using a stand-in model, the .h5 is absent)")
+        polls = _polls(scale)
+        for backend in backends:
+            with quiet():
+                classifier = CryClassifier(model_path, CATEGORIES, backend=backend)
+            results.add_latencies(f"predict.{backend}", timed_calls(classifier.predict, polls))
+            with quiet():
+                parity = classifier.check_parity()
+            results.add(f"predict.{backend}.top1_agreement", parity["top1_agreement"], "ratio", True)
+            features = np.concatenate([classifier._extract_features(s) for s, _ in polls[:8]])
+            with quiet():
+                durations = timed_calls(classifier.classify, [(features,)] * (5 * scale))
+            results.add(f"predict.{backend}.batch8_items_per_s", 8 / np.median(durations), "items/s", True)
+
+
+def bench_agents(results, scale):
+    from rl_agent.q_learning_agent import create_agent
+
+    rng = np.random.default_rng(3)
+    n = 20000 * scale
+    states = [CATEGORIES[i] for i in rng.integers(0, len(CATEGORIES), n)]
+    next_states = [CATEGORIES[i] for i in rng.integers(0, len(CATEGORIES), n)]
+    rewards = rng.choice([10.0, -1.0, 0.0], n)
+    actions = ["voice", "music"]
+
+    for backend in ("dict", "array"):
+        agent = create_agent(CATEGORIES, actions, backend=backend)
+        start = time.perf_counter()
+        chosen = [agent.choose_action(s) for s in states]
+        results.add(f"agent.{backend}.choose_per_s", n / (time.perf_counter() - start), "calls/s", True)
+
+        start = time.perf_counter()
+        for s, a, r, s2 in zip(states, chosen, rewards, next_states):
+            agent.update(s, a, r, s2)
+        results.add(f"agent.{backend}.update_per_s", n / (time.perf_counter() - start), "calls/s", True)
+
+        if backend == "array":
+            # Vectorized API, as used by many cradles at once or by replay training
+            batches = range(0, n, AGENT_BATCH)
+            start = time.perf_counter()
+            chosen_batch = []
+            for i in batches:
+                chosen_batch += agent.choose_actions(states[i:i + AGENT_BATCH])
+            results.add(f"agent.{backend}.choose_actions_items_per_s", n / (time.perf_counter() - start), "items/s", True)
+
+            transitions = list(zip(states, chosen_batch, rewards, next_states))
+            start = time.perf_counter()
+            for i in batches:
+                agent.update_batch(transitions[i:i + AGENT_BATCH])
+            results.add(f"agent.{backend}.update_batch_items_per_s", n / (time.perf_counter() - start), "items/s", True)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "q_table.pkl")
+            saves = 50 * scale
+            with quiet():
+                start = time.perf_counter()
+                for _ in range(saves):
+                    agent.save(path)
+                snapshot_rate = saves / (time.perf_counter() - start)
+
+                journaled = create_agent(CATEGORIES, actions, backend=backend)
+                journaled.load(path, journal=True, checkpoint_every=50)
+                start = time.perf_counter()
+                for s, a, r, s2 in zip(states[:2000], chosen, rewards, next_states):
+                    journaled.update(s, a, r, s2)
+                    journaled.save(path)
+                journaled_rate = 2000 / (time.perf_counter() - start)
+                journaled.close()
+            results.add(f"agent.{backend}.snapshot_save_per_s", snapshot_rate, "calls/s", True)
+            results.add(f"agent.{backend}.journaled_update_save_per_s", journaled_rate, "calls/s", True)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_websocket(results, scale, clients=(1, 8, 32), messages=200):
+    try:
+        import websockets
+    except ImportError:
+        results.skip("websocket", "websockets is not installed")
+        return
+    from websocket_server.server import WebSocketServer
+
+    payload = {"emotion": "hungry", "confidence": 0.87, "posture": "safe", "is_calm": False}
+    messages *= scale
+    for n_clients in clients:
+        port = _free_port()
+        # Queue deep enough for the whole burst: this measures throughput, not the drop policy
+        server = WebSocketServer("127.0.0.1", port, max_queue=messages + 1)
+        with quiet():
+            server.start()
+            while not (server.loop and server.loop.is_running()):
+                time.sleep(0.01)
+
+        async def _run():
+            connections = [await websockets.connect(f"ws://127.0.0.1:{port}") for _ in range(n_clients)]
+            while len(server.clients) < n_clients:
+                await asyncio.sleep(0.01)
+
+            async def _drain(ws):
+                for _ in range(messages):
+                    await ws.recv()
+
+            receivers = [asyncio.create_task(_drain(ws)) for ws in connections]
+            start = time.perf_counter()
+            for _ in range(messages):
+                server.broadcast_data(payload)
+            broadcast_time = time.perf_counter() - start
+            await asyncio.gather(*receivers)
+            delivered_time = time.perf_counter() - start
+            for ws in connections:
+                await ws.close()
+            return broadcast_time, delivered_time
+
+        with quiet():
+            broadcast_time, delivered_time = asyncio.run(_run())
+        results.add(f"websocket.{n_clients}_clients.broadcast_call_us", broadcast_time / messages * 1e6, "us", False)
+        results.add(f"websocket.{n_clients}_clients.delivered_msgs_per_s",
+                    messages * n_clients / delivered_time, "msgs/s", True)
+
+
+BENCHMARKS = {
+    "audio_buffer": bench_audio_buffer,
+    "features": bench_features,
+    "predict": bench_predict,
+    "agents": bench_agents,
+    "websocket": bench_websocket,
+}
+
+
+def compare(current, baseline, threshold):
+    """Names of metrics that got worse than `baseline` by more than `threshold` (relative)."""
+    regressions = []
+    for name, metric in current.items():
+        old = baseline.get(name)
+        if not old or old["value"] == 0:
+            continue
+        change = (metric["value"] - old["value"]) / abs(old["value"])
+        if not metric["higher_is_better"]:
+            change = -change
+        metric["baseline"] = old["value"]
+        metric["change"] = change
+        if change < -threshold:
+            regressions.append(name)
+            print(f"❌ {name}: {old['value']:,.3f} → {metric['value']:,.3f} {metric['unit']} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cradle's hot paths.")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply iteration counts for steadier numbers")
+    parser.add_argument("--out", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Results JSON of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    results = Results()
+    for name in args.only or BENCHMARKS:
+        print(f"🏁 {name}")
+        BENCHMARKS[name](results, args.scale)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(results.metrics, baseline, args.threshold)
+        print(f"{'❌' if regressions else '✅'} {len(regressions)} regression(s) beyond {args.threshold:.0%} "
+              f"against {args.baseline}")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "platform": platform.platform(), "scale": args.scale},
+        "metrics": results.metrics,
+        "skipped": results.skipped,
+        "regressions": regressions,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"💾 Results written to {args.out}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
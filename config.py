@@ -13,19 +13,123 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CRY_MODEL_PATH = os.path.join(BASE_DIR, "cry_model", "baby_cry_lstm_complete_acc_64%.h5")
 PARENT_VOICE_PATH = os.path.join(BASE_DIR, "audio", "parents_audio", "parent_voice_16k.wav")
 MUSIC_BASE_DIR = os.path.join(BASE_DIR, "music", "categorized_music")
+# Music playback: songs stop on their own after this long, fades/crossfades take MUSIC_FADE_MS
+MUSIC_MAX_PLAY_SECONDS = 120
+MUSIC_FADE_MS = 2000
+# Music track index and pre-decoded PCM cache (raw int16 at the mixer sample rate)
+MUSIC_INDEX_PATH = os.path.join(BASE_DIR, "data", "music_index.json")
+MUSIC_PCM_CACHE_ENABLED = True
+MUSIC_PCM_CACHE_DIR = os.path.join(BASE_DIR, "data", "music_pcm")
+MUSIC_PCM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Callback-driven output mixer shared by speech, music and white noise; music ducks under speech
+OUTPUT_MIXER_ENABLED = True
+OUTPUT_SAMPLE_RATE = 44100
+OUTPUT_CHANNELS = 2
+OUTPUT_BLOCKSIZE = 512       # Frames per callback (~12 ms at 44.1 kHz)
+OUTPUT_DUCK_GAIN = 0.3       # Music gain while the voice bus is active
+OUTPUT_DUCK_MS = 250
+# Optional steady white-noise bed on the mixer's noise bus (dBFS RMS, e.g. -35.0), faded in at startup.
+# None disables it. The microphone picks it up as well: a bed heard above GATE_NOISE_RMS_DB keeps the
+# silence gate from skipping classifications
+WHITE_NOISE_LEVEL_DB = None
+WHITE_NOISE_FADE_MS = 3000
+# Processed parent voice and speaker embedding, keyed by the source recording's hash
+VOICE_CACHE_DIR = os.path.join(BASE_DIR, "data", "voice_cache")
 
 # --- RL Q-Table Paths ---
 RL_TABLE_PATH = os.path.join(BASE_DIR, "data", "q_table", "q_table.pkl")
 MUSIC_RL_TABLE_PATH = os.path.join(BASE_DIR, "data", "q_table", "music_q_table.pkl")
+# Columnar log of every intervention transition, used by rl_agent.replay_trainer
+EXPERIENCE_LOG_ENABLED = True
+EXPERIENCE_LOG_DIR = os.path.join(BASE_DIR, "data", "experience")
+# Buffered rows are written at least this often (seconds), bounding what a crash can lose
+EXPERIENCE_LOG_FLUSH_INTERVAL = 30.0
+# Q-table backend: "dict" (per-state dicts) or "array" (dense float32 ndarray, vectorized batch API).
+# The online loop makes one call at a time, where "dict" is fastest; "array" pays off for batches
+RL_AGENT_BACKEND = "dict"
+# Append-only journal next to each table; snapshots are rewritten every RL_CHECKPOINT_EVERY updates
+RL_JOURNAL_ENABLED = True
+RL_JOURNAL_FSYNC_INTERVAL = 2.0
+RL_CHECKPOINT_EVERY = 50
+# Main agent actions; "voice_music" speaks over a ducked music bed and needs the output mixer
+MAIN_ACTIONS = ["voice", "music", "voice_music"] if OUTPUT_MIXER_ENABLED else ["voice", "music"]
+
+# Control Loop (seconds)
+POLL_INTERVAL = 1.0
+OBSERVATION_WINDOW = 10
+# Adaptive classification cadence: the interval grows by CADENCE_BACKOFF after every steady calm
+# reading, up to CADENCE_MAX_INTERVAL, and drops back to CADENCE_MIN_INTERVAL on distress, low
+# confidence, a state change or an audio onset (checked on new samples every CADENCE_TICK).
+# The maximum stays below SEGMENT_DURATION so consecutive windows overlap and no audio goes unclassified.
+# Setting both limits to POLL_INTERVAL gives the old fixed schedule.
+CADENCE_MIN_INTERVAL = POLL_INTERVAL
+CADENCE_MAX_INTERVAL = 4.0
+CADENCE_BACKOFF = 1.5
+CADENCE_STEADY_READINGS = 3      # Identical calm readings in a row before backing off
+CADENCE_STEADY_CONFIDENCE = 0.7
+CADENCE_TICK = 0.25
+
+# States that are considered "Calm/Safe"
+CALM_STATES = ["silence", "laugh", "noise"]
 
 # Server Settings
 WS_HOST = "0.0.0.0"
 WS_PORT = 8765
+# Broadcast encoding: "json", "orjson" (text frames) or "msgpack" (binary frames)
+WS_CODEC = "orjson"
+# Per-client outgoing queue; when full, "drop_oldest" or "coalesce" (replace the newest pending message)
+WS_CLIENT_QUEUE = 32
+WS_QUEUE_POLICY = "coalesce"
+# Opt-in binary log-mel/MFCC frame stream for dashboards; log-mel bands are averaged down to this many
+FEATURE_STREAM_ENABLED = True
+FEATURE_STREAM_MEL_BANDS = 32
+# Per-stage latency histograms, served as Prometheus text at ws://host:WS_PORT/metrics
+# and broadcast as a "metrics" message every METRICS_INTERVAL seconds
+TRACING_ENABLED = True
+METRICS_PATH = "/metrics"
+METRICS_INTERVAL = 30
 
 # AI Models
 TTS_MODEL_NAME = "tts_models/multilingual/multi-dataset/your_tts"
 LLM_MODEL_NAME = "gemma:2b"
 
+# Synthesized speech cache (keyed by text, speaker voice, model and language)
+TTS_CACHE_ENABLED = True
+TTS_CACHE_DIR = os.path.join(BASE_DIR, "data", "tts_cache")
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+TTS_CACHE_MEMORY_BYTES = 50 * 1024 * 1024
+TTS_PREWARM_FALLBACKS = True
+# Synthesize and play sentence by sentence to cut time-to-first-audio
+TTS_STREAMING = True
+
+# Background pool of pre-generated LLM phrases (depth 0 = call the LLM on demand)
+LLM_POOL_DEPTH = 3
+LLM_POOL_TTL = 3600          # Seconds before a pooled phrase is considered stale
+LLM_POOL_CONCURRENCY = 1     # Parallel LLM requests from the refill worker
+LLM_POOL_REFRESH = 30        # Seconds between refill/retry rounds
+
+# Cry model inference: "keras", "compiled" (warmed-up tf.function) or "tflite"
+CRY_INFERENCE_BACKEND = "compiled"
+# TFLite only: None (float32), "dynamic" or "int8"; converted files are cached next to CRY_MODEL_PATH
+CRY_TFLITE_QUANTIZATION = None
+# Non-keras backends are checked against the .h5 at load and replaced by keras below this top-1 agreement
+CRY_PARITY_MIN_AGREEMENT = 0.95
+# Multi-stream micro-batching: max wait to fill a batch (seconds) and max batch size
+CRY_BATCH_MAX_DELAY = 0.05
+CRY_BATCH_MAX_SIZE = 16
+# Offline feature store for retraining/evaluation (python -m cry_model.feature_store)
+FEATURE_STORE_DIR = os.path.join(BASE_DIR, "data", "feature_store")
+FEATURE_STORE_WORKERS = None   # Decode/extract processes; None = one per CPU
+
+# Multi-cradle host (python -m host.run): one worker process per cradle; the cry model and the
+# TTS/LLM stack are loaded once, in shared server processes reached through shared memory
+HOST_CRADLES_PATH = os.path.join(BASE_DIR, "data", "cradles.json")
+HOST_DATA_DIR = os.path.join(BASE_DIR, "data", "cradles")  # Per-cradle Q-tables and experience logs
+HOST_WS_PORT_BASE = WS_PORT       # Cradle i serves its WebSocket on HOST_WS_PORT_BASE + i
+HOST_SPEECH_SLOT_SAMPLES = 30 * 24000  # Per-cradle shared speech buffer: 30 s at up to 24 kHz
+HOST_CLASSIFY_TIMEOUT = 5.0       # Seconds a cradle waits for the shared classifier
+HOST_SPEECH_TIMEOUT = 60.0        # Seconds a cradle waits for a phrase from the speech server
+
 # High-Level Categories (States)
 CATEGORIES = [
     'belly pain', 'burping', 'discomfort', 'hungry', 'laugh',
@@ -43,4 +147,16 @@ MUSIC_CATEGORIES = [
     "noise",
     "trembling_pitch", 
     "silence"
-]
\ No newline at end of file
+]
+# Silence pre-gate in front of the cry model (levels in dBFS)
+GATE_ENABLED = True
+GATE_RMS_DB = -50.0          # Max frame level for voiced/tonal frames
+GATE_NOISE_RMS_DB = -40.0    # Max frame level for noise-like frames (high zero-crossing rate)
+GATE_FLUX_DB = -30.0         # Max spectral flux, catches soft onsets
+GATE_ZCR = 0.3               # Zero-crossing rate above which a frame counts as noise-like
+GATE_MIN_CONFIDENCE = 0.6    # Gate only answers "silence" above this confidence
+# Onset detector that triggers an immediate classification (levels in dBFS)
+ONSET_ENABLED = True
+ONSET_RISE_DB = 12.0         # Rise above the tracked noise floor that counts as an onset
+ONSET_MIN_DB = -50.0         # Ignore rises that stay below this level
+ONSET_FLOOR_SECONDS = 10.0   # How slowly the noise floor follows louder audio
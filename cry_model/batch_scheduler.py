@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from config import CRY_BATCH_MAX_DELAY, CRY_BATCH_MAX_SIZE
+
+
+class MicroBatchScheduler:
+    """
+    Shares one CryClassifier between several audio streams.
+    Callers extract features on their own thread and submit them; a worker
+    gathers submissions for up to `max_delay` seconds (or `max_batch_size`
+    items) and runs a single batched forward pass for all of them.
+    """
+    def __init__(self, classifier, max_delay=CRY_BATCH_MAX_DELAY, max_batch_size=CRY_BATCH_MAX_SIZE):
+        self.classifier = classifier
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, features):
+        """Queues (1, MAX_LEN, N_MFCC) features. Returns a Future resolving to (emotion, confidence)."""
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def predict(self, audio, end_position=None, stream="default"):
+        """Blocking, drop-in replacement for CryClassifier.predict."""
+        gated = self.classifier.gate_check(audio)
+        if gated:
+            return gated
+        features = self.classifier._extract_features(audio, end_position, stream)
+        if features is None:
+            return None, 0.0
+        return self.submit(features).result()
+
+    def client(self, stream):
+        """Returns a per-stream object exposing `predict(audio, end_position)` for a SmartCradleSystem."""
+        return StreamClient(self, stream)
+
+    def _gather(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-queue the stop marker so the worker exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = self._gather(first)
+            features = np.concatenate([f for f, _ in batch])
+            try:
+                results = self.classifier.classify(features)
+            except Exception as e:
+                results = [(None, 0.0)] * len(batch)
+                print(f"⚠️ Batched prediction error: {e}")
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+
+
+class StreamClient:
+    """One audio stream's view of a shared MicroBatchScheduler."""
+    def __init__(self, scheduler, stream):
+        self.scheduler = scheduler
+        self.stream = stream
+
+    def predict(self, audio, end_position=None):
+        return self.scheduler.predict(audio, end_position, self.stream)
+
+    def extractor(self):
+        return self.scheduler.classifier.extractor(self.stream)
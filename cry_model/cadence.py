@@ -0,0 +1,45 @@
+from collections import deque
+from config import (
+    CALM_STATES, CADENCE_MIN_INTERVAL, CADENCE_MAX_INTERVAL, CADENCE_BACKOFF,
+    CADENCE_STEADY_READINGS, CADENCE_STEADY_CONFIDENCE
+)
+
+
+class CadenceScheduler:
+    """
+    Decides how long to wait before the next classification. While the last
+    `steady_readings` results are the same calm state with enough confidence,
+    the interval grows by `backoff` per reading up to `max_interval`; any
+    distress, uncertain reading, state change or audio onset resets it to
+    `min_interval`.
+    """
+    def __init__(self, min_interval=CADENCE_MIN_INTERVAL, max_interval=CADENCE_MAX_INTERVAL, backoff=CADENCE_BACKOFF,
+                 steady_readings=CADENCE_STEADY_READINGS, steady_confidence=CADENCE_STEADY_CONFIDENCE):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.steady_confidence = steady_confidence
+        self.history = deque(maxlen=steady_readings)
+        self.interval = min_interval
+
+    def steady(self):
+        if len(self.history) < self.history.maxlen:
+            return False
+        emotion = self.history[0][0]
+        return emotion in CALM_STATES and all(
+            e == emotion and c >= self.steady_confidence for e, c in self.history
+        )
+
+    def observe(self, emotion, confidence):
+        """Records a classification. Returns the seconds to wait before the next one."""
+        self.history.append((emotion, confidence))
+        if self.steady():
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        else:
+            self.interval = self.min_interval
+        return self.interval
+
+    def onset(self):
+        """New activity in the audio: classify now and keep the fast rate until it is steady again."""
+        self.history.clear()
+        self.interval = self.min_interval
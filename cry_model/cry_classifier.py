@@ -1,11 +1,23 @@
+import threading
 import numpy as np
-import librosa
 from tensorflow.keras.models import load_model
-from config import SAMPLE_RATE, N_MFCC, MAX_LEN
+from config import SAMPLE_RATE, SEGMENT_SIZE, CRY_PARITY_MIN_AGREEMENT
+from cry_model.features import StreamingMFCC, extract_mfcc
+from cry_model.inference_backends import KerasBackend, create_backend, parity_report
+from telemetry.tracing import tracer
 
 class CryClassifier:
-    def __init__(self, model_path, categories):
+    def __init__(self, model_path, categories, streaming=True, backend="keras", quantization=None, gate=None):
         self.categories = categories
+        self.model_path = model_path
+        # Optional SilenceGate: answers quiet segments without running MFCC + model
+        self.gate = gate if gate is not None and gate.label in categories else None
+        # Reuses MFCC frames across overlapping polls when the caller passes the buffer position.
+        # One extractor per audio stream so several cradles can share this classifier.
+        self.streaming = streaming
+        self._extractors = {}
+        self._extractors_lock = threading.Lock()
+        self.backend = None
         try:
             self.model = load_model(model_path)
             print("✅ Cry model loaded successfully!")
@@ -13,15 +25,84 @@ class CryClassifier:
             print(f"❌ Failed to load Cry Model: {e}")
             self.model = None
 
-    def _extract_features(self, audio):
+        if self.model:
+            self._init_backend(backend, quantization)
+
+    def _init_backend(self, name, quantization):
+        """Builds the selected inference backend, falling back to plain Keras on failure."""
+        try:
+            calibration = self._calibration_features() if quantization == "int8" else None
+            self.backend = create_backend(name, self.model, self.model_path, quantization, calibration)
+            print(f"✅ Cry inference backend: {self.backend.name}")
+        except Exception as e:
+            print(f"⚠️ Inference backend '{name}' unavailable: {e}. Using Keras predict.")
+            self.backend = KerasBackend(self.model)
+            return
+
+        if isinstance(self.backend, KerasBackend):
+            return
+        # Converted/quantized models must still agree with the original before they are trusted
+        try:
+            report = self.check_parity()
+        except Exception as e:
+            print(f"⚠️ Parity check failed: {e}. Using Keras predict.")
+            self.backend = KerasBackend(self.model)
+            return
+        if report["top1_agreement"] < CRY_PARITY_MIN_AGREEMENT:
+            print(f"⚠️ {self.backend.name} agrees with the .h5 on only {report['top1_agreement']:.1%} "
+                  f"(< {CRY_PARITY_MIN_AGREEMENT:.0%}). Using Keras predict.")
+            self.backend = KerasBackend(self.model)
+
+    def _calibration_features(self, count=32, seed=0):
+        """Synthetic noise and harmonic bursts at varied levels, used for int8 calibration and parity checks."""
+        rng = np.random.default_rng(seed)
+        t = np.arange(SEGMENT_SIZE) / SAMPLE_RATE
+        features = []
+        for i in range(count):
+            level = 10 ** rng.uniform(-3, 0)
+            audio = rng.standard_normal(SEGMENT_SIZE) * level * 0.1
+            if i % 2:
+                f0 = rng.uniform(300, 600)
+                bursts = (np.sin(2 * np.pi * rng.uniform(0.5, 2) * t) > 0)
+                audio += level * bursts * sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 5))
+            features.append(extract_mfcc(audio.astype(np.float32)))
+        return np.stack(features).astype(np.float32)
+
+    def check_parity(self, segments=None):
+        """
+        Reports top-1 agreement of the active backend against the original .h5 model.
+        Uses synthetic audio when no segments are given.
+        """
+        if not self.model:
+            return None
+        if segments is None:
+            features = self._calibration_features()
+        else:
+            features = np.stack([extract_mfcc(np.asarray(s, dtype=np.float32)) for s in segments])
+        report = parity_report(KerasBackend(self.model), self.backend, features)
+        report["backend"] = self.backend.name
+        print(f"🔍 Parity ({report['backend']} vs .h5): top-1 agreement {report['top1_agreement']:.1%} "
+              f"over {report['samples']} samples, max |diff| {report['max_abs_diff']:.4f}")
+        return report
+
+    def _extractor(self, stream):
+        with self._extractors_lock:
+            if stream not in self._extractors:
+                self._extractors[stream] = StreamingMFCC()
+            return self._extractors[stream]
+
+    def extractor(self, stream="default"):
+        """The StreamingMFCC used for `stream`, or None when features are extracted in batch mode."""
+        return self._extractor(stream) if self.streaming else None
+
+    def _extract_features(self, audio, end_position=None, stream="default"):
         """Internal helper method to extract MFCC features."""
         try:
-            mfcc = librosa.feature.mfcc(y=audio, sr=SAMPLE_RATE, n_mfcc=N_MFCC).T
-            if mfcc.shape[0] < MAX_LEN:
-                pad_width = MAX_LEN - mfcc.shape[0]
-                mfcc = np.pad(mfcc, ((0, pad_width), (0, 0)), mode='constant')
-            else:
-                mfcc = mfcc[:MAX_LEN, :]
+            with tracer.span("feature_extraction"):
+                if self.streaming and end_position is not None:
+                    mfcc = self._extractor(stream).extract(audio, end_position)
+                else:
+                    mfcc = extract_mfcc(audio)
             return np.expand_dims(mfcc, axis=0)
         except Exception as e:
             print(f"⚠️ Feature extraction error: {e}")
@@ -48,19 +129,62 @@ class CryClassifier:
     #         print(f"⚠️ Feature extraction error: {e}")
     #         return None
 
-    def predict(self, audio):
-        """Returns (emotion, confidence) or (None, 0.0) on failure."""
+    def gate_check(self, audio):
+        """Returns the gate's synthesized (label, confidence) for quiet audio, otherwise None."""
+        if self.gate is None:
+            return None
+        return self.gate.check(audio)
+
+    def classify(self, features):
+        """Runs one forward pass over (N, MAX_LEN, N_MFCC) features. Returns a list of (emotion, confidence)."""
+        if not self.model:
+            return [(None, 0.0)] * len(features)
+        try:
+            with tracer.span("model_inference"):
+                pred = self.backend(features)
+            idx = np.argmax(pred, axis=1)
+            return [(self.categories[i], float(p[i])) for i, p in zip(idx, pred)]
+        except Exception as e:
+            print(f"⚠️ Prediction error: {e}")
+            return [(None, 0.0)] * len(features)
+
+    def predict(self, audio, end_position=None, stream="default"):
+        """
+        Returns (emotion, confidence) or (None, 0.0) on failure.
+        Pass the AudioBuffer end position to only extract features for new audio.
+        """
         if not self.model:
             return None, 0.0
 
-        features = self._extract_features(audio)
+        gated = self.gate_check(audio)
+        if gated:
+            return gated
+
+        features = self._extract_features(audio, end_position, stream)
         if features is None:
             return None, 0.0
 
-        try:
-            pred = self.model.predict(features, verbose=0)
-            idx = np.argmax(pred)
-            return self.categories[idx], float(pred[0][idx])
-        except Exception as e:
-            print(f"⚠️ Prediction error: {e}")
-            return None, 0.0
\ No newline at end of file
+        return self.classify(features)[0]
+
+    def predict_batch(self, segments, end_positions=None, streams=None):
+        """Classifies several segments with a single forward pass. Returns one (emotion, confidence) per segment."""
+        if not self.model:
+            return [(None, 0.0)] * len(segments)
+
+        end_positions = end_positions or [None] * len(segments)
+        streams = streams or ["default"] * len(segments)
+        results = [(None, 0.0)] * len(segments)
+        rows, batch = [], []
+        for i, (audio, position, stream) in enumerate(zip(segments, end_positions, streams)):
+            gated = self.gate_check(audio)
+            if gated:
+                results[i] = gated
+                continue
+            features = self._extract_features(audio, position, stream)
+            if features is not None:
+                rows.append(i)
+                batch.append(features)
+        if batch:
+            for i, result in zip(rows, self.classify(np.concatenate(batch))):
+                results[i] = result
+        return results
@@ -0,0 +1,369 @@
+"""
+Batch MFCC extraction for cry recordings into a memory-mapped feature store.
+
+Walks an audio directory tree, decodes and resamples every file to
+SAMPLE_RATE in a process pool, cuts it into SEGMENT_DURATION windows and
+stores their (MAX_LEN, N_MFCC) MFCCs as float16 rows of one flat file,
+opened with np.memmap. Each row records its source file, offset and label
+(the name of a parent folder that is in CATEGORIES). Rebuilding only decodes
+files whose content hash changed. Run from the repository root, e.g.:
+
+    python -m cry_model.feature_store build recordings/
+    python -m cry_model.feature_store evaluate --json eval.json
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from config import (
+    SAMPLE_RATE, SEGMENT_SIZE, MAX_LEN, N_MFCC, CATEGORIES, CRY_MODEL_PATH,
+    CRY_INFERENCE_BACKEND, CRY_TFLITE_QUANTIZATION, FEATURE_STORE_DIR, FEATURE_STORE_WORKERS
+)
+from cry_model.features import N_FFT, HOP_LENGTH, N_MELS, extract_mfcc
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.mp3')
+FEATURES_FILE = "features.f16"
+INDEX_FILE = "index.json"
+ROWS_FILE = "rows.npz"
+# Per-row metadata: source file id, start offset in samples, label index (-1 when unknown)
+ROW_COLUMNS = {"file_id": np.int32, "offset": np.int64, "label": np.int16}
+# Trailing audio shorter than this fraction of a segment is dropped (whole short files are kept)
+MIN_TAIL_FRACTION = 0.5
+
+
+def _params(hop):
+    """Everything the stored features depend on; a mismatch invalidates the store."""
+    return {
+        "sample_rate": SAMPLE_RATE, "segment_size": SEGMENT_SIZE, "hop": hop, "max_len": MAX_LEN,
+        "n_mfcc": N_MFCC, "n_fft": N_FFT, "hop_length": HOP_LENGTH, "n_mels": N_MELS,
+    }
+
+
+def content_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def segment_offsets(length, hop):
+    """Start offsets of the SEGMENT_SIZE windows cut from `length` samples."""
+    if length <= SEGMENT_SIZE:
+        return [0] if length else []
+    offsets = list(range(0, length - SEGMENT_SIZE + 1, hop))
+    tail = offsets[-1] + hop
+    if length - tail >= MIN_TAIL_FRACTION * SEGMENT_SIZE:
+        offsets.append(tail)
+    return offsets
+
+
+def extract_file(path, hop):
+    """
+    Worker: decodes `path` at SAMPLE_RATE (mono) and returns (features, offsets, seconds, sha256)
+    with features shaped (segments, MAX_LEN, N_MFCC) float16, as CryClassifier extracts them.
+    """
+    import librosa
+    audio, _ = librosa.load(path, sr=SAMPLE_RATE, mono=True)
+    offsets = segment_offsets(len(audio), hop)
+    features = np.empty((len(offsets), MAX_LEN, N_MFCC), dtype=np.float16)
+    for i, offset in enumerate(offsets):
+        features[i] = extract_mfcc(audio[offset:offset + SEGMENT_SIZE])
+    return features, np.asarray(offsets, dtype=np.int64), len(audio) / SAMPLE_RATE, content_hash(path)
+
+
+def _label(relpath):
+    """Nearest parent folder that names a category, else None."""
+    for part in reversed(os.path.dirname(relpath).split(os.sep)):
+        if part in CATEGORIES:
+            return part
+    return None
+
+
+class FeatureStore:
+    """
+    On-disk feature store. `features` is a read-only (N, MAX_LEN, N_MFCC)
+    float16 memmap and `rows` holds the matching file/offset/label columns.
+    `files` maps a path relative to the scanned root to its hash, size, mtime
+    and row range. Rows are appended; rows of changed or deleted files become
+    garbage until the store is compacted.
+    """
+    def __init__(self, directory=FEATURE_STORE_DIR):
+        self.directory = directory
+        self.row_bytes = MAX_LEN * N_MFCC * np.dtype(np.float16).itemsize
+        self.files = {}
+        self.file_ids = []   # file id -> relative path, never reused
+        self.params = None
+        self.root = None
+        self.rows = {name: np.empty(0, dtype=dtype) for name, dtype in ROW_COLUMNS.items()}
+        self._load()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        if not os.path.exists(self._path(INDEX_FILE)):
+            return
+        try:
+            with open(self._path(INDEX_FILE), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            with np.load(self._path(ROWS_FILE)) as rows:
+                self.rows = {name: rows[name].astype(dtype) for name, dtype in ROW_COLUMNS.items()}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Feature store index unreadable, rebuilding: {e}")
+            return
+        self.params = index["params"]
+        self.root = index.get("root")
+        self.files = index["files"]
+        self.file_ids = index["file_ids"]
+        # Drop rows appended after the last saved index (interrupted build)
+        with open(self._path(FEATURES_FILE), "ab") as f:
+            f.truncate(self.row_count * self.row_bytes)
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(ROWS_FILE + ".tmp.npz")
+        np.savez(tmp_path, **self.rows)
+        os.replace(tmp_path, self._path(ROWS_FILE))
+        index = {"params": self.params, "root": self.root, "files": self.files, "file_ids": self.file_ids}
+        tmp_path = self._path(INDEX_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, self._path(INDEX_FILE))
+
+    @property
+    def row_count(self):
+        return len(self.rows["file_id"])
+
+    @property
+    def features(self):
+        if not self.row_count:
+            return np.empty((0, MAX_LEN, N_MFCC), dtype=np.float16)
+        return np.memmap(self._path(FEATURES_FILE), dtype=np.float16, mode="r",
+                         shape=(self.row_count, MAX_LEN, N_MFCC))
+
+    def live_rows(self):
+        """Row indices that belong to files currently in the index."""
+        if not self.files:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([
+            np.arange(entry["first_row"], entry["first_row"] + entry["rows"]) for entry in self.files.values()
+        ]).astype(np.int64)
+
+    def _scan(self, root):
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    path = os.path.join(dirpath, name)
+                    found[os.path.relpath(path, root)] = path
+        return found
+
+    def _unchanged(self, relpath, path):
+        """True when the stored entry still matches the file; hashes only when size or mtime moved."""
+        entry = self.files.get(relpath)
+        if entry is None:
+            return False
+        stat = os.stat(path)
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        if entry["size"] == stat.st_size and entry["sha256"] == content_hash(path):
+            entry["mtime_ns"] = stat.st_mtime_ns  # Touched or copied, same content
+            return True
+        return False
+
+    def build(self, root, hop=SEGMENT_SIZE, workers=FEATURE_STORE_WORKERS):
+        """Brings the store up to date with the audio under `root`. Returns a summary dict."""
+        started = time.perf_counter()
+        params = _params(hop)
+        if self.params not in (None, params):
+            print("♻️ Feature parameters changed, rebuilding the store")
+            self.clear()
+        self.params = params
+        self.root = os.path.abspath(root)
+        os.makedirs(self.directory, exist_ok=True)
+
+        found = self._scan(root)
+        removed = [relpath for relpath in self.files if relpath not in found]
+        for relpath in removed:
+            del self.files[relpath]
+        pending = {relpath: path for relpath, path in found.items() if not self._unchanged(relpath, path)}
+        print(f"🎧 {len(found)} recordings, {len(pending)} to extract, {len(removed)} removed")
+
+        extracted, failed = 0, 0
+        with open(self._path(FEATURES_FILE), "ab") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(extract_file, path, hop): relpath for relpath, path in pending.items()}
+            for future in as_completed(futures):
+                relpath = futures[future]
+                path = pending[relpath]
+                try:
+                    features, offsets, seconds, digest = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"⚠️ Could not extract {relpath}: {e}")
+                    continue
+                out.write(features.tobytes())
+                self._append(relpath, path, offsets, seconds, digest)
+                extracted += 1
+                if extracted % 100 == 0:
+                    out.flush()
+                    self._save()
+                    print(f"   {extracted}/{len(pending)} files, {self.row_count} rows")
+
+        if self.row_count and len(self.live_rows()) < self.row_count / 2:
+            self.compact()
+        self._save()
+        summary = {
+            "files": len(self.files), "extracted": extracted, "failed": failed, "removed": len(removed),
+            "rows": len(self.live_rows()), "seconds": time.perf_counter() - started,
+        }
+        print(f"✅ Feature store: {summary['rows']} segments from {summary['files']} files "
+              f"({extracted} extracted in {summary['seconds']:.1f}s)")
+        return summary
+
+    def _append(self, relpath, path, offsets, seconds, digest):
+        stat = os.stat(path)
+        file_id = len(self.file_ids)
+        self.file_ids.append(relpath)
+        label = _label(relpath)
+        self.files[relpath] = {
+            "id": file_id,
+            "sha256": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "seconds": seconds,
+            "label": label,
+            "first_row": self.row_count,
+            "rows": len(offsets),
+        }
+        n = len(offsets)
+        new = {
+            "file_id": np.full(n, file_id), "offset": offsets,
+            "label": np.full(n, CATEGORIES.index(label) if label else -1),
+        }
+        self.rows = {name: np.concatenate((self.rows[name], new[name].astype(dtype)))
+                     for name, dtype in ROW_COLUMNS.items()}
+
+    def compact(self):
+        """Rewrites the features file without the rows of changed or deleted files."""
+        keep = self.live_rows()
+        print(f"🧹 Compacting feature store: {self.row_count - len(keep)} stale rows")
+        features = self.features
+        tmp_path = self._path(FEATURES_FILE + ".tmp")
+        with open(tmp_path, "wb") as out:
+            for start in range(0, len(keep), 4096):
+                out.write(np.ascontiguousarray(features[keep[start:start + 4096]]).tobytes())
+        del features
+        os.replace(tmp_path, self._path(FEATURES_FILE))
+
+        remap = np.full(self.row_count, -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        for entry in self.files.values():
+            entry["first_row"] = int(remap[entry["first_row"]]) if entry["rows"] else 0
+        self.rows = {name: column[keep] for name, column in self.rows.items()}
+
+    def clear(self):
+        self.files, self.file_ids, self.params, self.root = {}, [], None, None
+        self.rows = {name: np.empty(0, dtype=dtype) for name, dtype in ROW_COLUMNS.items()}
+        if os.path.exists(self._path(FEATURES_FILE)):
+            os.remove(self._path(FEATURES_FILE))
+
+    def labeled(self):
+        """(features memmap, row indices, label indices) for live rows with a known label."""
+        rows = self.live_rows()
+        labels = self.rows["label"][rows]
+        mask = labels >= 0
+        return self.features, rows[mask], labels[mask].astype(np.int64)
+
+
+def evaluate(store, classifier, batch_size=256):
+    """Classifies every labeled segment straight from the memmap. Returns accuracy and a confusion matrix."""
+    features, rows, labels = store.labeled()
+    if not len(rows):
+        raise ValueError("The feature store has no labeled segments")
+    predicted = np.empty(len(rows), dtype=np.int64)
+    started = time.perf_counter()
+    for start in range(0, len(rows), batch_size):
+        batch = np.asarray(features[rows[start:start + batch_size]], dtype=np.float32)
+        results = classifier.classify(batch)
+        predicted[start:start + len(batch)] = [
+            CATEGORIES.index(label) if label in CATEGORIES else -1 for label, _ in results
+        ]
+    seconds = time.perf_counter() - started
+
+    confusion = np.zeros((len(CATEGORIES), len(CATEGORIES)), dtype=np.int64)
+    valid = predicted >= 0
+    np.add.at(confusion, (labels[valid], predicted[valid]), 1)
+    per_class = {
+        category: float(confusion[i, i] / confusion[i].sum()) if confusion[i].sum() else None
+        for i, category in enumerate(CATEGORIES)
+    }
+
+    # File-level accuracy: majority vote over each recording's segments
+    files = store.rows["file_id"][rows]
+    file_hits = []
+    for file_id in np.unique(files):
+        mask = files == file_id
+        votes = np.bincount(predicted[mask][predicted[mask] >= 0], minlength=len(CATEGORIES))
+        file_hits.append(votes.any() and int(np.argmax(votes)) == labels[mask][0])
+
+    return {
+        "segments": int(len(rows)),
+        "files": len(file_hits),
+        "accuracy": float(np.mean(predicted == labels)),
+        "file_accuracy": float(np.mean(file_hits)),
+        "per_class_accuracy": per_class,
+        "confusion": confusion.tolist(),
+        "segments_per_second": len(rows) / seconds if seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract cry-model features into a memory-mapped store.")
+    parser.add_argument("--store", default=FEATURE_STORE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Extract features for new or changed recordings")
+    build.add_argument("root", help="Audio directory; files under a CATEGORIES-named folder are labeled")
+    build.add_argument("--hop", type=float, default=None, help="Seconds between segment starts (default: no overlap)")
+    build.add_argument("--workers", type=int, default=FEATURE_STORE_WORKERS)
+    build.add_argument("--compact", action="store_true", help="Drop stale rows even below the automatic threshold")
+    check = commands.add_parser("evaluate", help="Score the cry model on the stored labeled segments")
+    check.add_argument("--batch-size", type=int, default=256)
+    check.add_argument("--json", default=None, help="Write the report here")
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    if args.command == "build":
+        hop = int(args.hop * SAMPLE_RATE) if args.hop else SEGMENT_SIZE
+        store.build(args.root, hop, args.workers)
+        if args.compact and len(store.live_rows()) < store.row_count:
+            store.compact()
+            store._save()
+        return 0
+
+    from cry_model.cry_classifier import CryClassifier
+    classifier = CryClassifier(
+        CRY_MODEL_PATH, CATEGORIES, streaming=False,
+        backend=CRY_INFERENCE_BACKEND, quantization=CRY_TFLITE_QUANTIZATION
+    )
+    report = evaluate(store, classifier, args.batch_size)
+    print(f"\n📊 {report['segments']} segments from {report['files']} files: "
+          f"accuracy {report['accuracy']:.1%}, file accuracy {report['file_accuracy']:.1%} "
+          f"({report['segments_per_second']:.0f} segments/s)")
+    for category, accuracy in report["per_class_accuracy"].items():
+        if accuracy is not None:
+            print(f"   - {category:<12} {accuracy:.1%}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        print(f"💾 Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
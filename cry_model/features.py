@@ -0,0 +1,138 @@
+import numpy as np
+import librosa
+import scipy.fft
+from config import SAMPLE_RATE, N_MFCC, MAX_LEN
+
+# librosa.feature.mfcc defaults, spelled out so the streaming path can reproduce them
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+TOP_DB = 80.0
+AMIN = 1e-10
+
+
+def fit_to_max_len(mfcc):
+    """Pads or truncates a (frames, N_MFCC) matrix to (MAX_LEN, N_MFCC)."""
+    if mfcc.shape[0] < MAX_LEN:
+        pad_width = MAX_LEN - mfcc.shape[0]
+        return np.pad(mfcc, ((0, pad_width), (0, 0)), mode='constant')
+    return mfcc[:MAX_LEN, :]
+
+
+def extract_mfcc(audio):
+    """Batch MFCC extraction for a whole segment, shape (MAX_LEN, N_MFCC)."""
+    mfcc = librosa.feature.mfcc(y=audio, sr=SAMPLE_RATE, n_mfcc=N_MFCC).T
+    return fit_to_max_len(mfcc)
+
+
+class StreamingMFCC:
+    """
+    Incremental equivalent of `extract_mfcc` for a sliding window of audio.
+
+    Every call covers the newest window of the AudioBuffer, identified by the
+    absolute sample counter at its end. STFT frames whose support lies fully
+    inside the window only depend on the audio itself, so their log-mel
+    columns are cached by absolute position and reused on the next call.
+    Only frames over new audio, plus the few zero-padded edge frames, are
+    recomputed. The top_db clip and the DCT depend on the whole window, so
+    they are re-applied to the cached log-mel matrix each call, which is cheap
+    next to the STFT and mel projection.
+    """
+    def __init__(self, sr=SAMPLE_RATE, n_mfcc=N_MFCC, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS):
+        self.n_mfcc = n_mfcc
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+        self._columns = {}        # absolute start sample of a frame -> unclipped log-mel column
+        self.frames_computed = 0  # Counters to verify how much work is actually reused
+        self.frames_reused = 0
+        # Unclipped log-mel of the last window, kept for live feature streaming
+        self.last_log_mel = None
+        self.last_end_position = None
+        self._last_frames = None  # (absolute centre sample of frame 0, first and last interior frame)
+
+    def reset(self):
+        self._columns.clear()
+        self.last_log_mel = None
+        self.last_end_position = None
+        self._last_frames = None
+
+    def log_mel_since(self, position):
+        """
+        Interior (non-padded) log-mel frames of the last window centred after
+        absolute sample `position`. Returns ((n_mels, k) columns, (k,) centres).
+        """
+        if self.last_log_mel is None:
+            return np.empty((len(self.mel_basis), 0), dtype=np.float32), np.empty(0, dtype=np.int64)
+        first_centre, t_lo, t_hi = self._last_frames
+        centres = first_centre + np.arange(t_lo, t_hi + 1) * self.hop_length
+        keep = centres > position
+        return self.last_log_mel[:, t_lo:t_hi + 1][:, keep], centres[keep]
+
+    def _log_mel(self, frames_audio):
+        """Unclipped log-mel columns for consecutive frames of an unpadded slice."""
+        stft = librosa.stft(frames_audio, n_fft=self.n_fft, hop_length=self.hop_length, center=False)
+        power = np.abs(stft) ** 2
+        mel = np.einsum("...ft,mf->...mt", power, self.mel_basis, optimize=True)
+        return 10.0 * np.log10(np.maximum(AMIN, mel))
+
+    def extract(self, audio, end_position):
+        """Returns (MAX_LEN, N_MFCC) features for `audio`, which ends at absolute sample `end_position`."""
+        length = len(audio)
+        if length < self.n_fft:
+            return extract_mfcc(audio)
+
+        half = self.n_fft // 2
+        hop = self.hop_length
+        n_frames = 1 + length // hop
+        window_start = int(end_position) - length
+
+        # Frames [t_lo, t_hi] need no padding; frame t starts at audio index t*hop - half
+        t_lo = -(-half // hop)
+        t_hi = (half + length - self.n_fft) // hop
+
+        columns = [None] * n_frames
+        missing = []
+        for t in range(t_lo, t_hi + 1):
+            column = self._columns.get(window_start + t * hop - half)
+            if column is None:
+                missing.append(t)
+            else:
+                columns[t] = column
+        self.frames_reused += (t_hi - t_lo + 1) - len(missing)
+
+        if missing:
+            t_a, t_b = missing[0], missing[-1]
+            start = t_a * hop - half
+            computed = self._log_mel(audio[start:t_b * hop - half + self.n_fft])
+            for i, t in enumerate(range(t_a, t_b + 1)):
+                columns[t] = computed[:, i]
+            self.frames_computed += t_b - t_a + 1
+
+        # Edge frames see the zero padding of center=True and are always recomputed
+        if t_lo > 0:
+            head = np.concatenate((np.zeros(half, dtype=audio.dtype), audio[:(t_lo - 1) * hop + self.n_fft - half]))
+            computed = self._log_mel(head)
+            for t in range(t_lo):
+                columns[t] = computed[:, t]
+        if t_hi + 1 < n_frames:
+            start = (t_hi + 1) * hop - half
+            stop = (n_frames - 1) * hop + self.n_fft - half
+            tail = np.concatenate((audio[start:], np.zeros(stop - length, dtype=audio.dtype)))
+            computed = self._log_mel(tail)
+            for i, t in enumerate(range(t_hi + 1, n_frames)):
+                columns[t] = computed[:, i]
+        self.frames_computed += t_lo + (n_frames - 1 - t_hi)
+
+        # Keep only the interior columns of this window for the next call
+        self._columns = {
+            window_start + t * hop - half: columns[t] for t in range(t_lo, t_hi + 1)
+        }
+
+        log_mel = np.stack(columns, axis=1)
+        self.last_log_mel = log_mel
+        self.last_end_position = end_position
+        self._last_frames = (window_start, t_lo, t_hi)
+        log_mel = np.maximum(log_mel, log_mel.max() - TOP_DB)
+        mfcc = scipy.fft.dct(log_mel, axis=-2, type=2, norm="ortho")[:self.n_mfcc]
+        return fit_to_max_len(mfcc.T)
@@ -0,0 +1,138 @@
+import os
+import numpy as np
+import tensorflow as tf
+from config import MAX_LEN, N_MFCC
+
+QUANTIZATION_MODES = (None, "dynamic", "int8")
+
+
+class KerasBackend:
+    """Original path: Keras' batch-oriented `model.predict`."""
+    name = "keras"
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, features):
+        return self.model.predict(features, verbose=0)
+
+
+class CompiledBackend:
+    """Keras model wrapped in a tf.function with a fixed feature shape, traced before first use."""
+    name = "compiled"
+
+    def __init__(self, model):
+        spec = tf.TensorSpec([None, MAX_LEN, N_MFCC], tf.float32)
+        self._fn = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+        # Warm-up so tracing happens at startup instead of during the first cry
+        self(np.zeros((1, MAX_LEN, N_MFCC), dtype=np.float32))
+
+    def __call__(self, features):
+        return self._fn(tf.convert_to_tensor(features, dtype=tf.float32)).numpy()
+
+
+def _interpreter_class():
+    """Prefers the standalone runtime when installed, otherwise the one bundled with TensorFlow."""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        return tf.lite.Interpreter
+
+
+class TFLiteBackend:
+    """TFLite interpreter over a single-sample converted graph."""
+    name = "tflite"
+
+    def __init__(self, tflite_path, num_threads=None):
+        self.path = tflite_path
+        self.interpreter = _interpreter_class()(model_path=tflite_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self(np.zeros((1, MAX_LEN, N_MFCC), dtype=np.float32))
+
+    def __call__(self, features):
+        features = np.asarray(features, dtype=np.float32)
+        outputs = []
+        # The converted graph has a fixed batch of 1
+        for sample in features:
+            self.interpreter.set_tensor(self._input["index"], sample[None])
+            self.interpreter.invoke()
+            outputs.append(self.interpreter.get_tensor(self._output["index"])[0].copy())
+        return np.stack(outputs)
+
+
+def tflite_cache_path(model_path, quantization=None):
+    """Converted models live next to the .h5, one file per quantization mode."""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}.{quantization or 'float32'}.tflite"
+
+
+def convert_to_tflite(model, model_path, quantization=None, representative_features=None):
+    """
+    Converts the Keras model to TFLite, reusing the cached file while it is newer than the .h5.
+    quantization: None (float32), "dynamic" (dynamic-range weights) or "int8"
+    (weights and activations, calibrated on `representative_features`).
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode: {quantization}")
+
+    path = tflite_cache_path(model_path, quantization)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(model_path):
+        return path
+
+    print(f"🔧 Converting cry model to TFLite ({quantization or 'float32'})...")
+    spec = tf.TensorSpec([1, MAX_LEN, N_MFCC], tf.float32)
+    concrete = tf.function(lambda x: model(x, training=False)).get_concrete_function(spec)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+
+    if quantization in ("dynamic", "int8"):
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "int8":
+        if representative_features is None:
+            raise ValueError("int8 quantization needs representative features for calibration")
+
+        def representative_dataset():
+            for sample in representative_features:
+                yield [np.asarray(sample, dtype=np.float32)[None]]
+        converter.representative_dataset = representative_dataset
+
+    try:
+        tflite_model = converter.convert()
+    except Exception as e:
+        # Some LSTM variants only convert with the TF select ops enabled
+        print(f"⚠️ Builtin-only conversion failed ({e}). Retrying with TF select ops...")
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+        tflite_model = converter.convert()
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(tflite_model)
+    os.replace(tmp_path, path)
+    print(f"💾 TFLite model cached at {path}")
+    return path
+
+
+def create_backend(name, model, model_path, quantization=None, representative_features=None):
+    """Builds the named backend ("keras", "compiled" or "tflite") for a loaded Keras model."""
+    if name == "keras":
+        return KerasBackend(model)
+    if name == "compiled":
+        return CompiledBackend(model)
+    if name == "tflite":
+        path = convert_to_tflite(model, model_path, quantization, representative_features)
+        return TFLiteBackend(path)
+    raise ValueError(f"Unknown inference backend: {name}")
+
+
+def parity_report(reference, candidate, features):
+    """Compares two backends on the same (N, MAX_LEN, N_MFCC) features."""
+    features = np.asarray(features, dtype=np.float32)
+    ref = np.asarray(reference(features))
+    out = np.asarray(candidate(features))
+    return {
+        "samples": int(len(features)),
+        "top1_agreement": float(np.mean(np.argmax(ref, axis=1) == np.argmax(out, axis=1))),
+        "max_abs_diff": float(np.max(np.abs(ref - out))),
+    }
@@ -0,0 +1,105 @@
+import time
+import queue
+import numpy as np
+from config import HOST_CLASSIFY_TIMEOUT, HOST_SPEECH_TIMEOUT
+from cry_model.features import StreamingMFCC, extract_mfcc
+from telemetry.tracing import tracer
+
+
+class _RemoteCall:
+    """
+    Request/reply with one shared model server, matched by sequence number.
+    `requests` is the server's shared queue, `replies` its per-cradle reply queues.
+    """
+    def __init__(self, index, requests, replies, ready, timeout):
+        self.index = index
+        self.requests = requests
+        self.replies = replies[index]
+        self.ready = ready
+        self.timeout = timeout
+        self._seq = 0
+
+    def _call(self, *args):
+        """Sends (index, seq, *args) and returns the server's result, or None on timeout."""
+        if not self.ready.is_set():
+            print("⏳ Waiting for the shared model server...")
+            self.ready.wait()
+        self._seq += 1
+        self.requests.put((self.index, self._seq, *args))
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                seq, result = self.replies.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                print(f"⚠️ Shared model server did not answer within {self.timeout:.0f}s")
+                return None
+            if seq == self._seq:
+                return result
+            # Late answer to a request that already timed out
+
+
+class RemoteClassifier(_RemoteCall):
+    """
+    Cradle-side stand-in for CryClassifier. The silence gate and the streaming
+    MFCC run in the cradle process, so the live feature stream still works;
+    only the forward pass happens in the shared classifier process, reading
+    the features from this cradle's shared slot.
+    """
+    def __init__(self, index, feature_slots, requests, replies, ready, gate=None):
+        super().__init__(index, requests, replies, ready, HOST_CLASSIFY_TIMEOUT)
+        self.slots = feature_slots  # Keeps the segment mapped for as long as the view is used
+        self.features = feature_slots[index]
+        self.gate = gate
+        self._mfcc = StreamingMFCC()
+
+    def extractor(self):
+        return self._mfcc
+
+    def predict(self, audio, end_position=None):
+        """Returns (emotion, confidence) or (None, 0.0) on failure, like CryClassifier.predict."""
+        gated = self.gate.check(audio) if self.gate is not None else None
+        if gated:
+            return gated
+        try:
+            with tracer.span("feature_extraction"):
+                mfcc = self._mfcc.extract(audio, end_position) if end_position is not None else extract_mfcc(audio)
+        except Exception as e:
+            print(f"⚠️ Feature extraction error: {e}")
+            return None, 0.0
+        self.features[:] = mfcc
+        with tracer.span("model_inference"):
+            result = self._call()
+        return result or (None, 0.0)
+
+
+class RemoteSoother(_RemoteCall):
+    """
+    Cradle-side stand-in for ParentSoother. The shared speech server writes the
+    phrase's waveform into this cradle's speech slot; it is played here,
+    through the cradle's OutputMixer on the cradle's own speaker.
+    """
+    def __init__(self, index, audio_slots, requests, replies, ready, output_mixer=None):
+        super().__init__(index, requests, replies, ready, HOST_SPEECH_TIMEOUT)
+        self.slots = audio_slots
+        self.audio = audio_slots[index]
+        self.output_mixer = output_mixer
+        self.tts_service = self   # SmartCradleSystem reads tts_service.last_playback_start
+        self.last_playback_start = None
+
+    def soothe(self, emotion):
+        requested = time.perf_counter()
+        self.last_playback_start = None
+        result = self._call(emotion)
+        if result is None:
+            return
+        phrase, n, sr = result
+        # Copied out so the next request can reuse the slot while this one plays
+        wav = np.array(self.audio[:n])
+        print(f"📝 Generated phrase: {phrase}")
+
+        self.last_playback_start = time.monotonic()
+        tracer.record("playback_start.voice", time.perf_counter() - requested)
+        try:
+            self.output_mixer.wait(self.output_mixer.play(wav, sr, bus="voice"))
+        except Exception as e:
+            print(f"⚠️ Playback error: {e}")
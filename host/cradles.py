@@ -0,0 +1,46 @@
+import os
+import json
+from config import HOST_DATA_DIR, HOST_WS_PORT_BASE, PARENT_VOICE_PATH
+
+
+class CradleSpec:
+    """
+    One cradle run by the host: its audio devices, parent voice, WebSocket
+    port and the directory holding its Q-tables and experience log.
+    """
+    def __init__(self, name, index, input_device=None, output_device=None, ws_port=None,
+                 parent_name="Mommy", parent_voice=PARENT_VOICE_PATH, data_dir=None):
+        self.name = name
+        self.index = index
+        self.input_device = input_device    # sounddevice device index or name, None for the default
+        self.output_device = output_device
+        self.ws_port = ws_port or HOST_WS_PORT_BASE + index
+        self.parent_name = parent_name
+        self.parent_voice = parent_voice
+        self.data_dir = data_dir or os.path.join(HOST_DATA_DIR, name)
+
+    def path(self, *parts):
+        return os.path.join(self.data_dir, *parts)
+
+    def __repr__(self):
+        return f"CradleSpec({self.name!r}, ws_port={self.ws_port}, input={self.input_device!r})"
+
+
+def load_cradles(path):
+    """
+    Reads a JSON list of cradles, e.g.
+    [{"name": "bed-1", "input_device": 2, "output_device": 3, "parent_name": "Mommy",
+      "parent_voice": "audio/parents_audio/bed1.wav"}, ...]
+    Only "name" is required.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    names = [entry["name"] for entry in entries]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate cradle names in {path}")
+    return [CradleSpec(index=i, **entry) for i, entry in enumerate(entries)]
+
+
+def default_cradles(count):
+    """`count` cradles on the default audio devices, for trying the host out."""
+    return [CradleSpec(f"cradle-{i + 1}", i) for i in range(count)]
@@ -0,0 +1,144 @@
+"""
+Shared model servers for the multi-cradle host. Each runs in its own process
+and loads its model once for every cradle:
+
+- serve_classifier: the cry model. Cradles write (MAX_LEN, N_MFCC) features
+  into their shared slot and send (cradle, seq); requests from all cradles are
+  batched into single forward passes by a MicroBatchScheduler.
+- serve_speech: the TTS model and one LLM phrase source per parent. Cradles
+  send (cradle, seq, emotion); the waveform is written into the cradle's
+  shared speech slot and played by the cradle itself.
+
+Replies go to the cradle's own queue as (seq, result).
+"""
+import time
+import threading
+import numpy as np
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    CRY_MODEL_PATH, CATEGORIES, CALM_STATES, CRY_INFERENCE_BACKEND, CRY_TFLITE_QUANTIZATION,
+    LLM_MODEL_NAME, TTS_MODEL_NAME, TTS_CACHE_ENABLED, TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_CACHE_MEMORY_BYTES,
+    TTS_PREWARM_FALLBACKS, VOICE_CACHE_DIR, LLM_POOL_DEPTH, LLM_POOL_TTL, LLM_POOL_CONCURRENCY, LLM_POOL_REFRESH
+)
+from host.shared_slots import SharedSlots
+
+
+def _reply(replies, seq, future):
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"⚠️ Shared classifier error: {e}")
+        result = (None, 0.0)
+    replies.put((seq, result))
+
+
+def serve_classifier(feature_spec, requests, replies, ready):
+    """Process target: one CryClassifier for every cradle. Stops on a None request."""
+    from cry_model.cry_classifier import CryClassifier
+    from cry_model.batch_scheduler import MicroBatchScheduler
+
+    started = time.monotonic()
+    features = SharedSlots.attach(feature_spec)
+    # Streaming extraction and the silence gate run in the cradles; only the forward pass is shared
+    classifier = CryClassifier(
+        CRY_MODEL_PATH, CATEGORIES, streaming=False,
+        backend=CRY_INFERENCE_BACKEND, quantization=CRY_TFLITE_QUANTIZATION
+    )
+    scheduler = MicroBatchScheduler(classifier).start()
+    print(f"🧠 Shared cry classifier ready in {time.monotonic() - started:.1f}s")
+    ready.set()
+
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            cradle, seq = request
+            # Copied on receipt: after a timeout the cradle rewrites its slot for the next request
+            # while this one may still be queued in the scheduler
+            future = scheduler.submit(np.array(features[cradle:cradle + 1]))
+            future.add_done_callback(partial(_reply, replies[cradle], seq))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        print(f"🧠 Classifier served {scheduler.items} predictions in {scheduler.batches} batches")
+        features.close()
+
+
+def serve_speech(audio_spec, cradles, requests, replies, ready):
+    """
+    Process target: one TTS model and speech cache shared by every cradle,
+    with a ParentSoother per cradle for its parent's name and voice.
+    Stops on a None request.
+    """
+    from tts_soother.parent_soother import ParentSoother
+    from tts_soother.services import TTSService
+    from tts_soother.audio_cache import SynthesisCache
+
+    started = time.monotonic()
+    audio = SharedSlots.attach(audio_spec)
+    tts_service = TTSService(
+        TTS_MODEL_NAME,
+        cache=SynthesisCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_CACHE_MEMORY_BYTES) if TTS_CACHE_ENABLED else None
+    )
+    soothers = [
+        ParentSoother(
+            llm_model=LLM_MODEL_NAME,
+            tts_model=TTS_MODEL_NAME,
+            parent_name=cradle.parent_name,
+            parent_voice_path=cradle.parent_voice,
+            prewarm_fallbacks=TTS_PREWARM_FALLBACKS,
+            voice_cache_dir=VOICE_CACHE_DIR,
+            tts_service=tts_service,
+            phrase_pool={
+                "pool_emotions": [c for c in CATEGORIES if c not in CALM_STATES],
+                "pool_depth": LLM_POOL_DEPTH,
+                "pool_ttl": LLM_POOL_TTL,
+                "pool_concurrency": LLM_POOL_CONCURRENCY,
+                "pool_refresh": LLM_POOL_REFRESH
+            }
+        )
+        for cradle in cradles
+    ]
+    print(f"🗣️ Shared speech server ready in {time.monotonic() - started:.1f}s ({len(soothers)} voices)")
+    ready.set()
+
+    # Latest request per cradle. A render the cradle already gave up on must not write the slot,
+    # which the cradle may be copying out for a newer reply
+    latest = [0] * len(soothers)
+    slot_locks = [threading.Lock() for _ in soothers]
+
+    def _render(cradle, seq, emotion):
+        try:
+            phrase, wav, sr = soothers[cradle].render(emotion)
+            with slot_locks[cradle]:
+                if seq != latest[cradle]:
+                    return  # Timed out on the cradle side; its reply would be dropped anyway
+                slot = audio[cradle]
+                if len(wav) > len(slot):
+                    print(f"⚠️ Phrase for cradle {cradle} is longer than its speech slot; truncating")
+                    wav = wav[:len(slot)]
+                slot[:len(wav)] = wav
+                replies[cradle].put((seq, (phrase, len(wav), sr)))
+        except Exception as e:
+            print(f"❌ Speech error for cradle {cradle}: {e}")
+            replies[cradle].put((seq, None))
+
+    # The LLM calls of different cradles overlap; synthesis itself is serialized by the TTS lock
+    workers = ThreadPoolExecutor(max_workers=len(soothers), thread_name_prefix="speech")
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            cradle, seq = request[:2]
+            with slot_locks[cradle]:
+                latest[cradle] = seq
+            workers.submit(_render, *request)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        workers.shutdown(wait=True)
+        audio.close()
@@ -0,0 +1,176 @@
+"""
+Runs several cradles on one machine. Every cradle gets its own worker
+process (microphone, speaker, RL agents, Q-tables, WebSocket port), while
+the cry model and the TTS/LLM stack are loaded once, in two shared server
+processes. Features and synthesized speech cross between processes through
+shared memory, so adding a cradle costs a light worker instead of a full set
+of models.
+
+    python -m host.run                       # cradles from HOST_CRADLES_PATH
+    python -m host.run --cradles ward.json
+    python -m host.run --count 4             # 4 cradles on the default devices
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import multiprocessing as mp
+from config import (
+    MAX_LEN, N_MFCC, GATE_ENABLED, HOST_CRADLES_PATH, HOST_SPEECH_SLOT_SAMPLES,
+    MUSIC_BASE_DIR, MUSIC_CATEGORIES, MUSIC_INDEX_PATH
+)
+from host.cradles import load_cradles, default_cradles
+from host.shared_slots import SharedSlots
+from host.model_server import serve_classifier, serve_speech
+
+
+def run_cradle(cradle, feature_spec, audio_spec, classifier_channel, speech_channel):
+    """Process target: one SmartCradleSystem wired to the shared model servers."""
+    from system_controller import SmartCradleSystem
+    from audio.activity_gate import SilenceGate
+    from host.clients import RemoteClassifier, RemoteSoother
+
+    features = SharedSlots.attach(feature_spec)
+    audio = SharedSlots.attach(audio_spec)
+    print(f"🛏️ Starting {cradle}")
+    classifier = RemoteClassifier(
+        cradle.index, features, *classifier_channel, gate=SilenceGate() if GATE_ENABLED else None
+    )
+    soother = RemoteSoother(cradle.index, audio, *speech_channel)
+    system = SmartCradleSystem(cry_classifier=classifier, soother=soother, cradle=cradle)
+    soother.output_mixer = system.output_mixer  # Speech plays on this cradle's own speaker
+    try:
+        system.run()
+    finally:
+        features.close()
+        audio.close()
+
+
+def rss_mb(pid):
+    """Resident memory of a process in MB (Linux only), None when unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+class CradleHost:
+    """Owns the shared memory, the two model servers and one worker process per cradle."""
+    def __init__(self, cradles):
+        self.cradles = cradles
+        # spawn: workers must not inherit TensorFlow/torch state, and start without loading either
+        self.ctx = mp.get_context("spawn")
+        self.features = SharedSlots(len(cradles), (MAX_LEN, N_MFCC))
+        self.audio = SharedSlots(len(cradles), (HOST_SPEECH_SLOT_SAMPLES,))
+        self.servers = {}
+        self.workers = {}
+        self._requests = []
+
+    def _channel(self):
+        """(requests, per-cradle replies, ready) for one model server."""
+        requests = self.ctx.Queue()
+        self._requests.append(requests)
+        return requests, [self.ctx.Queue() for _ in self.cradles], self.ctx.Event()
+
+    def start(self):
+        # Probe the music folders once here, so the workers only load an up-to-date index
+        from music.music_library import MusicLibrary
+        MusicLibrary(MUSIC_BASE_DIR, MUSIC_CATEGORIES, MUSIC_INDEX_PATH)
+
+        classifier_channel = self._channel()
+        speech_channel = self._channel()
+        self.ready = (classifier_channel[2], speech_channel[2])
+        self.servers["classifier"] = self.ctx.Process(
+            target=serve_classifier, args=(self.features.spec(), *classifier_channel), name="classifier"
+        )
+        self.servers["speech"] = self.ctx.Process(
+            target=serve_speech, args=(self.audio.spec(), self.cradles, *speech_channel), name="speech"
+        )
+        # Cradles start listening right away and wait for the servers on their first request
+        for cradle in self.cradles:
+            self.workers[cradle.name] = self.ctx.Process(
+                target=run_cradle,
+                args=(cradle, self.features.spec(), self.audio.spec(), classifier_channel, speech_channel),
+                name=cradle.name
+            )
+        for process in (*self.servers.values(), *self.workers.values()):
+            process.start()
+        print(f"🏥 Host started {len(self.cradles)} cradles "
+              f"({(self.features.nbytes + self.audio.nbytes) / 1e6:.1f} MB shared memory)")
+        threading.Thread(target=self._report_when_ready, daemon=True).start()
+        return self
+
+    def _report_when_ready(self):
+        for event in self.ready:
+            event.wait()
+        time.sleep(5)  # Let the workers settle before measuring
+        self.print_memory()
+
+    def memory(self):
+        """Resident MB per process: the host, each model server and each cradle."""
+        report = {"host": rss_mb(os.getpid())}
+        for name, process in (*self.servers.items(), *self.workers.items()):
+            report[name] = rss_mb(process.pid) if process.is_alive() else None
+        return report
+
+    def print_memory(self):
+        report = self.memory()
+        known = [mb for mb in report.values() if mb is not None]
+        if not known:
+            return
+        print(f"\n📊 Resident memory: {sum(known):.0f} MB total")
+        for name, mb in report.items():
+            print(f"   - {name:<16} {'n/a' if mb is None else f'{mb:.0f} MB'}")
+
+    def wait(self):
+        for process in self.workers.values():
+            process.join()
+
+    def stop(self, timeout=10.0):
+        # Ctrl+C reaches every process in the group; cradles then save their tables on their own
+        for process in self.workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for requests in self._requests:
+            requests.put(None)
+        for process in self.servers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.features.close()
+        self.audio.close()
+        print("👋 Host stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several cradles with shared model servers.")
+    parser.add_argument("--cradles", default=HOST_CRADLES_PATH, help="JSON list of cradles")
+    parser.add_argument("--count", type=int, default=None, help="Run this many cradles on the default devices")
+    args = parser.parse_args()
+
+    if args.count:
+        cradles = default_cradles(args.count)
+    elif os.path.exists(args.cradles):
+        cradles = load_cradles(args.cradles)
+    else:
+        print(f"❌ No cradle list at {args.cradles}. Pass --cradles or --count.")
+        return 1
+
+    host = CradleHost(cradles).start()
+    try:
+        host.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
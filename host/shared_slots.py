@@ -0,0 +1,46 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedSlots:
+    """
+    `count` fixed-shape numpy slots in one named shared-memory segment, one
+    slot per cradle. The host creates the segment and worker processes attach
+    to it by spec(). Each slot is only written by one side of a request/reply
+    exchange at a time (the cradle before sending, the server before replying),
+    so no lock is needed.
+    """
+    def __init__(self, count, shape, dtype=np.float32, name=None):
+        self.count = count
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        size = count * int(np.prod(self.shape)) * self.dtype.itemsize
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray((count, *self.shape), dtype=self.dtype, buffer=self._shm.buf)
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    def spec(self):
+        """Picklable description for attach() in another process."""
+        return self._shm.name, self.count, self.shape, self.dtype.str
+
+    @classmethod
+    def attach(cls, spec):
+        name, count, shape, dtype = spec
+        return cls(count, shape, dtype, name=name)
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def close(self):
+        """Detaches; the creating process also removes the segment."""
+        self.array = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
@@ -0,0 +1,208 @@
+import os
+import json
+import random
+import hashlib
+import tempfile
+import threading
+import numpy as np
+import librosa
+import soundfile as sf
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav')
+
+
+def _atomic_write(path, data):
+    """
+    Writes `data` to `path` through a uniquely named temp file in the same
+    directory, so several processes sharing the cache never swap each other's files.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class MusicLibrary:
+    """
+    Index of the categorized music folders, built once and persisted as JSON.
+    Each track records its duration and native sample rate, read from the
+    file header, plus its loudness once the track has been decoded for
+    playback. A rescan only probes files whose mtime or size changed.
+    """
+    def __init__(self, base_dir, categories, index_path=None):
+        self.base_dir = base_dir
+        self.categories = categories
+        self.index_path = index_path
+        self.tracks = {}  # category -> list of track dicts
+        self._lock = threading.Lock()
+        self._load_index()
+        self.refresh()
+
+    def _load_index(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.tracks = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Music index unreadable, rebuilding: {e}")
+            self.tracks = {}
+
+    def _save_index(self):
+        if not self.index_path:
+            return
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        with self._lock:
+            data = json.dumps(self.tracks, indent=1).encode("utf-8")
+        _atomic_write(self.index_path, data)
+
+    def _probe(self, path):
+        """Duration and native sample rate from the file header, without decoding the audio."""
+        try:
+            info = sf.info(path)
+            return {"duration": float(info.duration), "sample_rate": int(info.samplerate)}
+        except Exception:
+            # Formats libsndfile cannot open; librosa falls back to audioread
+            return {"duration": float(librosa.get_duration(path=path)), "sample_rate": int(librosa.get_samplerate(path))}
+
+    def record_loudness(self, track, samples):
+        """Stores the RMS loudness (dBFS) of a track's decoded `samples` in the index."""
+        if "loudness_db" in track or not len(samples):
+            return
+        rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+        with self._lock:
+            track["loudness_db"] = float(20 * np.log10(rms + 1e-10))
+        try:
+            self._save_index()
+        except OSError as e:
+            print(f"⚠️ Could not save the music index: {e}")
+
+    def refresh(self):
+        """Rescans every category folder, probing only new or modified files."""
+        changed = False
+        tracks = {}
+        for category in self.categories:
+            folder = os.path.join(self.base_dir, category)
+            known = {t["path"]: t for t in self.tracks.get(category, [])}
+            found = []
+            if os.path.isdir(folder):
+                for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+                    if not entry.is_file() or not entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                        continue
+                    stat = entry.stat()
+                    track = known.get(entry.path)
+                    if track and track["mtime"] == stat.st_mtime and track["size"] == stat.st_size:
+                        found.append(track)
+                        continue
+                    try:
+                        info = self._probe(entry.path)
+                    except Exception as e:
+                        print(f"⚠️ Could not index {entry.name}: {e}")
+                        continue
+                    found.append({
+                        "path": entry.path,
+                        "name": entry.name,
+                        "category": category,
+                        "mtime": stat.st_mtime,
+                        "size": stat.st_size,
+                        **info
+                    })
+                    changed = True
+            if len(found) != len(known):
+                changed = True
+            tracks[category] = found
+
+        with self._lock:
+            self.tracks = tracks
+        if changed:
+            try:
+                self._save_index()
+            except OSError as e:
+                print(f"⚠️ Could not save the music index: {e}")
+        print(f"🎼 Music library: {sum(len(t) for t in tracks.values())} tracks in {len(tracks)} categories")
+
+    def choose(self, category):
+        """Random track dict from `category`, or None when it has no tracks."""
+        with self._lock:
+            tracks = self.tracks.get(category) or []
+            return random.choice(tracks) if tracks else None
+
+
+class PCMCache:
+    """
+    Tracks decoded to the mixer's sample rate and channel count, stored as raw
+    int16 files and opened as memory maps. Capped by total size with least
+    recently used files evicted first. `on_decoded(track, samples)` is called
+    with every freshly decoded track, e.g. MusicLibrary.record_loudness.
+    """
+    def __init__(self, cache_dir, max_bytes, on_decoded=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.on_decoded = on_decoded
+        os.makedirs(cache_dir, exist_ok=True)
+        self._building = set()
+        self._lock = threading.Lock()
+
+    def _path(self, track, rate, channels):
+        key = f"{track['path']}|{track['mtime']}|{track['size']}|{rate}|{channels}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pcm")
+
+    def get(self, track, rate, channels):
+        """Memory-mapped (frames, channels) int16 array, or None when not cached yet."""
+        path = self._path(track, rate, channels)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)  # mtime doubles as the LRU timestamp
+        return np.memmap(path, dtype=np.int16, mode="r").reshape(-1, channels)
+
+    def build(self, track, rate, channels):
+        """Decodes `track` into the cache. Safe to call from a background thread."""
+        path = self._path(track, rate, channels)
+        with self._lock:
+            if path in self._building or os.path.exists(path):
+                return
+            self._building.add(path)
+        try:
+            y, _ = librosa.load(track["path"], sr=rate, mono=(channels == 1))
+            if self.on_decoded is not None:
+                self.on_decoded(track, y)
+            frames = y.reshape(1, -1) if y.ndim == 1 else y
+            if frames.shape[0] != channels:
+                frames = np.repeat(frames[:1], channels, axis=0)
+            pcm = (np.clip(frames.T, -1.0, 1.0) * 32767).astype(np.int16)
+            _atomic_write(path, pcm.tobytes())
+            self._evict()
+        except Exception as e:
+            print(f"⚠️ PCM cache build failed for {track['name']}: {e}")
+        finally:
+            with self._lock:
+                self._building.discard(path)
+
+    def build_async(self, track, rate, channels):
+        threading.Thread(target=self.build, args=(track, rate, channels), daemon=True).start()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pcm"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Evicted by another cradle process meanwhile
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -1,71 +1,299 @@
-import os
-import random
 import time
+import threading
 import pygame
-from config import MUSIC_BASE_DIR, MUSIC_CATEGORIES, MUSIC_RL_TABLE_PATH, CATEGORIES
-from rl_agent.q_learning_agent import QLearningAgent
+import librosa
+import soxr
+import soundfile as sf
+from config import (
+    MUSIC_BASE_DIR, MUSIC_CATEGORIES, MUSIC_RL_TABLE_PATH, CATEGORIES,
+    MUSIC_MAX_PLAY_SECONDS, MUSIC_FADE_MS, MUSIC_INDEX_PATH, MUSIC_PCM_CACHE_ENABLED, MUSIC_PCM_CACHE_DIR, MUSIC_PCM_CACHE_MAX_BYTES,
+    RL_AGENT_BACKEND, RL_JOURNAL_ENABLED, RL_JOURNAL_FSYNC_INTERVAL, RL_CHECKPOINT_EVERY
+)
+from rl_agent.q_learning_agent import create_agent
+from music.music_library import MusicLibrary, PCMCache
+from audio.output_mixer import BufferSource, QueueSource
+from telemetry.tracing import tracer
 
-class MusicPlayer:
-    def __init__(self):
-        # Initialize the audio mixer
+class PlaybackHandle:
+    """
+    A song started by MusicPlayer. Playback runs in the mixer; the handle can
+    stop or fade it, and stops it by itself after `max_duration` seconds.
+    """
+    def __init__(self, player, category, track, sound=None, fade_ms=0, max_duration=None, source=None):
+        self.player = player
+        self.category = category
+        self.track = track
+        self.sound = sound        # Cached PCM Sound, or None when using the music stream
+        self.source = source      # BufferSource on the OutputMixer, when there is one
+        self.channel = None
+        self.fade_ms = fade_ms
+        self.started_at = time.monotonic()
+        self.stopped = False
+        self._pending = None      # Timer for a stream start waiting on a fade-out
+        self._timer = None
+        if max_duration:
+            self._timer = threading.Timer(max_duration, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def start_stream(self, fade_ms=0):
+        pygame.mixer.music.load(self.track["path"])
+        pygame.mixer.music.play(fade_ms=fade_ms)
+        self.player.stream_owner = self
+
+    def start_stream_later(self, delay):
+        def _start():
+            if not self.stopped:
+                self.start_stream(self.fade_ms)
+            self._pending = None
+        # Claim the stream now so the fading song's handle stops reporting it as its own
+        self.player.stream_owner = self
+        self._pending = threading.Timer(delay, _start)
+        self._pending.daemon = True
+        self._pending.start()
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def is_playing(self):
+        if self.stopped:
+            return False
+        if self.source is not None:
+            return not self.source.done
         if not pygame.mixer.get_init():
+            return False
+        if self.sound is not None:
+            return bool(self.channel and self.channel.get_busy() and self.channel.get_sound() is self.sound)
+        if self._pending is not None:
+            return True
+        return self.player.stream_owner is self and pygame.mixer.music.get_busy()
+
+    def stop(self, fade_ms=None):
+        """Stops playback, fading out over `fade_ms` (defaults to the handle's fade)."""
+        fade_ms = self.fade_ms if fade_ms is None else fade_ms
+        playing = self.is_playing()
+        self.stopped = True
+        for timer in (self._timer, self._pending):
+            if timer:
+                timer.cancel()
+        self._pending = None
+        if not playing:
+            return
+
+        if self.source is not None:
+            self.source.fade_out(self.player.output_mixer.frames(fade_ms / 1000.0))
+        elif self.sound is not None:
+            if fade_ms:
+                self.channel.fadeout(fade_ms)
+            else:
+                self.channel.stop()
+        elif fade_ms:
+            # music.fadeout can block until the fade ends, so keep it off the caller's thread
+            threading.Thread(target=pygame.mixer.music.fadeout, args=(fade_ms,), daemon=True).start()
+        else:
+            pygame.mixer.music.stop()
+        print(f"⏹️ Stopped: {self.track['name']} after {self.elapsed():.0f}s")
+
+    def wait(self, timeout=None):
+        """Blocks until playback ends or `timeout` seconds pass. Returns True if it ended."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_playing():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+
+class MusicPlayer:
+    def __init__(self, output_mixer=None, table_path=MUSIC_RL_TABLE_PATH):
+        # pygame is only the fallback output; with an OutputMixer every song goes through its
+        # (ducked) music bus on the mixer's device, so no second output device is opened
+        if output_mixer is None and not pygame.mixer.get_init():
             pygame.mixer.init()
         
         self.base_dir = MUSIC_BASE_DIR
+        # Optional OutputMixer: every track then plays on its "music" bus, ducking under speech.
+        # Tracks not in the PCM cache yet are decoded when first played.
+        self.output_mixer = output_mixer
+
+        # Track index built once at startup instead of listing folders on every play
+        self.library = MusicLibrary(self.base_dir, MUSIC_CATEGORIES, MUSIC_INDEX_PATH)
+        self.pcm_cache = PCMCache(
+            MUSIC_PCM_CACHE_DIR, MUSIC_PCM_CACHE_MAX_BYTES, on_decoded=self.library.record_loudness
+        ) if MUSIC_PCM_CACHE_ENABLED else None
+        self.current = None       # PlaybackHandle of the latest song
+        self.stream_owner = None  # Handle currently owning pygame.mixer.music
+        self._lock = threading.RLock()
         
         # Initialize the RL Agent specifically for Music Selection
         # States = Baby's Emotions | Actions = Music Folders/Categories
-        self.agent = QLearningAgent(states=CATEGORIES, actions=MUSIC_CATEGORIES)
-        self.agent.load(MUSIC_RL_TABLE_PATH)
+        # (table_path differs per cradle when several run on one host)
+        self.table_path = table_path
+        self.agent = create_agent(states=CATEGORIES, actions=MUSIC_CATEGORIES, backend=RL_AGENT_BACKEND)
+        self.agent.load(
+            self.table_path,
+            journal=RL_JOURNAL_ENABLED,
+            fsync_interval=RL_JOURNAL_FSYNC_INTERVAL,
+            checkpoint_every=RL_CHECKPOINT_EVERY
+        )
 
-    def play_music(self, emotion):
-        """Plays a song based on the RL agent's dynamic selection."""
+    def _mixer_format(self):
+        """(sample_rate, channels) of the mixer when it uses signed 16-bit samples, otherwise None."""
+        if self.output_mixer is not None:
+            return self.output_mixer.sample_rate, self.output_mixer.channels
+        init = pygame.mixer.get_init()
+        if not init or init[1] != -16:
+            return None
+        return init[0], init[2]
+
+    def _cached_pcm(self, track):
+        """Returns pre-decoded PCM for `track`, scheduling the decode on a miss."""
+        mixer_format = self._mixer_format()
+        if self.pcm_cache is None or mixer_format is None:
+            return None
+        pcm = self.pcm_cache.get(track, *mixer_format)
+        if pcm is None:
+            self.pcm_cache.build_async(track, *mixer_format)
+        return pcm
+
+    def _mixer_source(self, track, fade_in_frames):
+        """
+        Music-bus source for `track` and whether it came from the PCM cache. On
+        a miss the cache is built in the background while the song plays from a
+        QueueSource that a decoder thread fills a few seconds ahead, so playback
+        never waits for the whole file to decode.
+        """
+        rate, channels = self.output_mixer.sample_rate, self.output_mixer.channels
+        if self.pcm_cache is not None:
+            pcm = self.pcm_cache.get(track, rate, channels)
+            if pcm is not None:
+                # The memmap is paged in block by block from the audio callback
+                return BufferSource(pcm, channels, bus="music", fade_in_frames=fade_in_frames), True
+            self.pcm_cache.build_async(track, rate, channels)
+        source = QueueSource(channels, bus="music", fade_in_frames=fade_in_frames)
+        threading.Thread(target=self._stream_decode, args=(track, source), daemon=True).start()
+        return source, False
+
+    def _stream_decode(self, track, source, block_seconds=0.5, ahead_seconds=5.0):
+        """Decodes `track` into `source` block by block until it ends or the source is stopped."""
+        rate = self.output_mixer.sample_rate
+        appended = False
+        try:
+            with sf.SoundFile(track["path"]) as f:
+                resampler = soxr.ResampleStream(f.samplerate, rate, f.channels) if f.samplerate != rate else None
+                block_frames = int(f.samplerate * block_seconds)
+                while not source.done:
+                    if source.remaining() > ahead_seconds * rate:
+                        time.sleep(block_seconds / 2)
+                        continue
+                    block = f.read(block_frames, dtype="float32", always_2d=True)
+                    last = len(block) < block_frames
+                    if resampler is not None:
+                        block = resampler.resample_chunk(block, last=last)
+                    source.append(block)
+                    appended = True
+                    if last:
+                        break
+        except Exception as e:
+            if appended:
+                print(f"⚠️ Music decode error in {track['name']}: {e}")
+            else:
+                # Formats libsndfile cannot read: decode the whole file on this thread instead
+                try:
+                    y, _ = librosa.load(track["path"], sr=rate, mono=(self.output_mixer.channels == 1))
+                    source.append(y.T if y.ndim > 1 else y)
+                except Exception as e:
+                    print(f"⚠️ Could not decode {track['name']}: {e}")
+        finally:
+            source.finish()
+
+    def _cached_sound(self, track):
+        """Returns a Sound backed by pre-decoded PCM, or None on a cache miss."""
+        pcm = self._cached_pcm(track)
+        return pygame.mixer.Sound(buffer=pcm) if pcm is not None else None
+
+    def play_music(self, emotion, max_duration=MUSIC_MAX_PLAY_SECONDS, fade_ms=MUSIC_FADE_MS):
+        """
+        Starts a song based on the RL agent's dynamic selection and returns
+        immediately with a PlaybackHandle (or None when nothing could play).
+        A song that is still playing is crossfaded into the new one.
+        """
         print(f"🎵 Music Player received emotion: {emotion}")
         
         # RL Agent decides the music category (Action) based on emotion (State)
         chosen_category = self.agent.choose_action(emotion)
         print(f"🧠 Music RL Agent selected category: {chosen_category}")
-        
-        folder_path = os.path.join(self.base_dir, chosen_category)
-        
-        if not os.path.exists(folder_path):
-            print(f"⚠️ Music category folder not found: {folder_path}")
-            return None
+        return self.play_category(chosen_category, max_duration, fade_ms)
 
-        try:
-            songs = [f for f in os.listdir(folder_path) if f.lower().endswith(('.mp3', '.wav'))]
-        except Exception as e:
-            print(f"⚠️ Error accessing music folder: {e}")
-            return None
+    def crossfade_to(self, category, fade_ms=MUSIC_FADE_MS, max_duration=MUSIC_MAX_PLAY_SECONDS):
+        """Fades the current song out while a song from `category` fades in."""
+        return self.play_category(category, max_duration, fade_ms)
 
-        if not songs:
-            print(f"⚠️ No songs found in {folder_path}")
-            return None
+    def play_category(self, category, max_duration=MUSIC_MAX_PLAY_SECONDS, fade_ms=MUSIC_FADE_MS):
+        with tracer.span("playback_start.music"):
+            return self._play_category(category, max_duration, fade_ms)
 
+    def _play_category(self, category, max_duration, fade_ms):
         # Pick a random song from the chosen category
-        song_file = random.choice(songs)
-        song_path = os.path.join(folder_path, song_file)
-        
+        track = self.library.choose(category)
+        if track is None:
+            print(f"⚠️ No songs found for category: {category}")
+            return None
+
+        # Sources are prepared before taking the lock, which stop() needs from the event loop thread
+        fade_in = fade_ms if self.is_playing() else 0
+        sound = source = None
+        cached = False
         try:
-            print(f"▶️ Playing: {song_file}")
-            pygame.mixer.music.load(song_path)
-            pygame.mixer.music.play()
-            
-            # Non-blocking wait
-            while pygame.mixer.music.get_busy():
-                time.sleep(1)
-                
+            if self.output_mixer is not None:
+                source, cached = self._mixer_source(track, self.output_mixer.frames(fade_in / 1000.0))
+            else:
+                sound = self._cached_sound(track)
+                cached = sound is not None
         except Exception as e:
             print(f"❌ Error playing music: {e}")
-            
-        # Return the chosen category so the system_controller can grade its success
-        return chosen_category
+            return None
+
+        with self._lock:
+            previous = self.current if self.current and self.current.is_playing() else None
+            try:
+                print(f"▶️ Playing: {track['name']}{' (cached PCM)' if cached else ''}")
+                handle = PlaybackHandle(self, category, track, sound, fade_ms, max_duration, source)
+                if previous:
+                    previous.stop(fade_ms)
 
-    def stop(self):
-        """Stops any currently playing music."""
-        pygame.mixer.music.stop()
+                if source:
+                    self.output_mixer.add(source)
+                elif sound:
+                    handle.channel = sound.play(fade_ms=fade_in)
+                elif previous and previous.channel is None and previous.source is None:
+                    # One music stream: the new song starts once the old one has faded out
+                    handle.start_stream_later(fade_ms / 1000.0)
+                else:
+                    handle.start_stream(fade_in)
+            except Exception as e:
+                print(f"❌ Error playing music: {e}")
+                if source is not None:
+                    source.stop()  # Ends its decoder thread
+                return None
+
+            self.current = handle
+            return handle
+
+    def is_playing(self):
+        return bool(self.current and self.current.is_playing())
+
+    def stop(self, fade_ms=MUSIC_FADE_MS):
+        """Stops (fades out) any currently playing music, e.g. as soon as the baby is calm."""
+        with self._lock:
+            if self.current:
+                self.current.stop(fade_ms)
         
     def update_agent(self, state, action, reward, next_state):
         """Updates the Q-table for music preferences based on the reward."""
         self.agent.update(state, action, reward, next_state)
-        self.agent.save(MUSIC_RL_TABLE_PATH)
\ No newline at end of file
+        self.agent.save(self.table_path)
+
+    def close(self):
+        """Flushes the music agent's journal into a final snapshot."""
+        self.agent.close()
@@ -0,0 +1,147 @@
+import os
+import re
+import glob
+import time
+import threading
+import numpy as np
+
+# Column name -> dtype; state/action columns hold indices into the part's vocabularies
+COLUMNS = {
+    "state": np.int16,
+    "action": np.int8,
+    "sub_action": np.int8,   # -1 when the action had no sub-action (e.g. voice)
+    "reward": np.float32,
+    "next_state": np.int16,
+    "confidence": np.float32,
+    "timestamp": np.float64,
+}
+
+
+class ExperienceLog:
+    """
+    Compact columnar log of (state, action, sub_action, reward, next_state,
+    confidence, timestamp) transitions. Rows are buffered in memory and
+    written as numbered .npz parts, each carrying its own vocabularies.
+    A part is written every `flush_every` rows and, from a background
+    thread, every `flush_interval` seconds, so a crash loses at most the
+    rows logged in the last `flush_interval` seconds.
+    """
+    def __init__(self, directory, states, actions, sub_actions, flush_every=32, flush_interval=30.0):
+        self.directory = directory
+        self.states = [str(s) for s in states]
+        self.actions = [str(a) for a in actions]
+        self.sub_actions = [str(a) for a in sub_actions]
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._next_part = self._last_part() + 1
+        self._closed = threading.Event()
+        self._thread = None
+        if flush_interval:
+            self._thread = threading.Thread(target=self._flusher, daemon=True)
+            self._thread.start()
+
+    def _last_part(self):
+        """Highest existing part number, -1 when there is none. Gaps from deleted parts are never reused."""
+        numbers = [
+            int(match.group(1)) for match in
+            (re.fullmatch(r"part-(\d+)\.npz", os.path.basename(p))
+             for p in glob.glob(os.path.join(self.directory, "part-*.npz")))
+            if match
+        ]
+        return max(numbers, default=-1)
+
+    @staticmethod
+    def _index(vocab, value):
+        """Index of `value` in `vocab`, extending it for values outside the configured list."""
+        value = str(value)
+        if value not in vocab:
+            vocab.append(value)
+        return vocab.index(value)
+
+    def log(self, state, action, sub_action, reward, next_state, confidence=0.0, timestamp=None):
+        with self._lock:
+            self._rows.append((
+                self._index(self.states, state),
+                self._index(self.actions, action),
+                -1 if sub_action is None else self._index(self.sub_actions, sub_action),
+                reward,
+                self._index(self.states, next_state),
+                confidence or 0.0,
+                time.time() if timestamp is None else timestamp,
+            ))
+            if len(self._rows) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._rows:
+            return
+        columns = {
+            name: np.array(values, dtype=dtype)
+            for (name, dtype), values in zip(COLUMNS.items(), zip(*self._rows))
+        }
+        path = os.path.join(self.directory, f"part-{self._next_part:06d}.npz")
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    vocab_states=np.array(self.states),
+                    vocab_actions=np.array(self.actions),
+                    vocab_sub_actions=np.array(self.sub_actions),
+                    **columns
+                )
+            os.replace(tmp_path, path)
+            self._next_part += 1
+            self._rows = []
+        except OSError as e:
+            print(f"⚠️ Experience log write error: {e}")
+
+    def _flusher(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+
+
+def _remap(part_vocab, vocab):
+    """Lookup table from a part's vocabulary to `vocab`; unknown names (and index -1) map to -1."""
+    return np.array([vocab.index(v) if v in vocab else -1 for v in part_vocab] + [-1], dtype=np.int64)
+
+
+def load_experience(directory, states, actions, sub_actions):
+    """
+    Reads every part under `directory` and re-indexes it against the given
+    vocabularies. Returns a dict of column arrays; names outside the
+    vocabularies map to -1.
+    """
+    states, actions, sub_actions = list(states), list(actions), list(sub_actions)
+    parts = {name: [] for name in COLUMNS}
+
+    for path in sorted(glob.glob(os.path.join(directory, "part-*.npz"))):
+        with np.load(path) as data:
+            remap = {
+                "state": _remap(list(data["vocab_states"]), states),
+                "next_state": _remap(list(data["vocab_states"]), states),
+                "action": _remap(list(data["vocab_actions"]), actions),
+                "sub_action": _remap(list(data["vocab_sub_actions"]), sub_actions),
+            }
+            for name in COLUMNS:
+                values = data[name]
+                if name in remap:
+                    # -1 indexes the trailing sentinel, so missing sub-actions stay -1
+                    values = remap[name][values.astype(np.int64)]
+                parts[name].append(values)
+
+    return {
+        name: np.concatenate(chunks) if chunks else np.empty(0, dtype=COLUMNS[name])
+        for name, chunks in parts.items()
+    }
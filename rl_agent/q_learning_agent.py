@@ -1,7 +1,11 @@
 import random
 import pickle
 import os
+import time
+import threading
 from collections import defaultdict
+import numpy as np
+from rl_agent.q_table_journal import QTableJournal, atomic_pickle
 
 class QLearningAgent:
     def __init__(self, states, actions, alpha=0.6, gamma=0.9, epsilon=0.2):
@@ -10,39 +14,275 @@ class QLearningAgent:
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
+        self._init_table()
+        # Optional write-ahead journal; see load(..., journal=True)
+        self.journal = None
+        self.journal_table_path = None
+        self.checkpoint_every = None
+        self._lock = threading.RLock()
+
+    def _init_table(self):
         self.Q = defaultdict(lambda: {a: 0.0 for a in self.actions})
 
+    def set_q(self, state, action, q_value):
+        self.Q[state][action] = q_value
+
+    def to_dict(self):
+        """Plain {state: {action: q}} dict, the on-disk pickle format."""
+        return dict(self.Q)
+
+    def _seeded_row(self, values):
+        """
+        Q-values of a saved row for the configured actions. Actions added since the
+        table was saved start at the mean of the row's known values rather than 0.0,
+        which would make greedy selection always pick them wherever the learned values
+        are negative; actions no longer configured are dropped.
+        """
+        known = [values[a] for a in self.actions if a in values]
+        seed = sum(known) / len(known) if known else 0.0
+        return {a: values.get(a, seed) for a in self.actions}
+
+    def from_dict(self, q_dict):
+        self.Q = defaultdict(
+            lambda: {a: 0.0 for a in self.actions},
+            {state: self._seeded_row(values) for state, values in q_dict.items()}
+        )
+
     def choose_action(self, state):
         if random.random() < self.epsilon:
             return random.choice(self.actions)
-        
+
         q_vals = self.Q[state]
         max_val = max(q_vals.values())
         best_actions = [a for a, v in q_vals.items() if v == max_val]
         return random.choice(best_actions)
 
     def update(self, state, action, reward, next_state):
-        current_q = self.Q[state][action]
-        max_next_q = max(self.Q[next_state].values()) if self.Q[next_state] else 0.0
-        
-        # Q-Learning formula
-        new_q = current_q + self.alpha * (reward + self.gamma * max_next_q - current_q)
-        self.Q[state][action] = new_q
+        with self._lock:
+            current_q = self.Q[state][action]
+            max_next_q = max(self.Q[next_state].values()) if self.Q[next_state] else 0.0
+
+            # Q-Learning formula
+            new_q = current_q + self.alpha * (reward + self.gamma * max_next_q - current_q)
+            self.Q[state][action] = new_q
+            if self.journal:
+                self.journal.append(state, action, new_q)
 
     def save(self, filepath):
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, "wb") as f:
-            pickle.dump(dict(self.Q), f)
+        """
+        With a journal attached to `filepath`, updates are already durable in the
+        journal, so this only writes a snapshot every `checkpoint_every` records.
+        Otherwise writes the full table atomically.
+        """
+        if self.journal and filepath == self.journal_table_path:
+            if self.journal.records >= self.checkpoint_every:
+                self.checkpoint()
+            return
+
+        with self._lock:
+            atomic_pickle(self.to_dict(), filepath)
         print("💾 Q-table saved.")
 
-    def load(self, filepath):
+    def checkpoint(self):
+        """Atomically snapshots the table, then empties the journal it supersedes."""
+        with self._lock:
+            atomic_pickle(self.to_dict(), self.journal_table_path)
+            self.journal.reset()
+        print("💾 Q-table checkpoint written.")
+
+    def load(self, filepath, journal=False, fsync_interval=2.0, checkpoint_every=50):
+        """
+        Loads the pickled table. With journal=True, also replays `<filepath>.journal`
+        on top of it and keeps appending every update to that journal.
+        An unreadable table is moved aside together with its journal (see
+        `_quarantine`) and no journal is attached, so nothing overwrites it;
+        this run then starts fresh and saves full snapshots.
+        """
         if not os.path.exists(filepath):
             print("⚠️ No previous Q-table found. Starting fresh.")
+        else:
+            try:
+                with open(filepath, "rb") as f:
+                    q_dict = pickle.load(f)
+                self.from_dict(q_dict)
+                print("✅ Q-table loaded.")
+            except Exception as e:
+                print(f"❌ Error loading Q-table: {e}")
+                self._init_table()
+                self._quarantine(filepath)
+                return
+
+        if journal:
+            self._attach_journal(filepath, fsync_interval, checkpoint_every)
+
+    @staticmethod
+    def _quarantine(filepath):
+        """Renames an unreadable table and its journal to `*.corrupt-<timestamp>` for manual recovery."""
+        suffix = f".corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+        for path in (filepath, filepath + ".journal"):
+            if os.path.exists(path):
+                try:
+                    os.replace(path, path + suffix)
+                    print(f"🗄️ Moved {path} to {path + suffix}; starting fresh.")
+                except OSError as e:
+                    print(f"⚠️ Could not move {path} aside: {e}")
+
+    def replay_journal(self, filepath):
+        """Applies the updates journaled next to `filepath` without attaching the journal. Returns their count."""
+        replayed = 0
+        for state, action, q_value in QTableJournal.replay(filepath + ".journal"):
+            self.set_q(state, action, q_value)
+            replayed += 1
+        if replayed:
+            print(f"🔁 Replayed {replayed} journaled Q-updates.")
+        return replayed
+
+    def _attach_journal(self, filepath, fsync_interval, checkpoint_every):
+        journal_path = filepath + ".journal"
+        self.replay_journal(filepath)
+
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        self.journal = QTableJournal(journal_path, fsync_interval)
+        self.journal_table_path = filepath
+        self.checkpoint_every = checkpoint_every
+
+    def close(self):
+        """Flushes the journal and folds it into a final snapshot."""
+        if self.journal:
+            self.checkpoint()
+            self.journal.close()
+            self.journal = None
+
+
+class ArrayQLearningAgent(QLearningAgent):
+    """
+    Same agent backed by a dense float32 (n_states, n_actions) array with
+    precomputed state/action index maps. Adds vectorized `choose_actions` and
+    `update_batch` for many cradles or large replayed logs. Reads and writes
+    the same pickle format as QLearningAgent, so existing tables load as-is.
+    """
+    def __init__(self, states, actions, alpha=0.6, gamma=0.9, epsilon=0.2, seed=None):
+        self.rng = np.random.default_rng(seed)
+        super().__init__(states, actions, alpha, gamma, epsilon)
+
+    def _init_table(self):
+        self.state_list = list(self.states)
+        self.state_index = {s: i for i, s in enumerate(self.state_list)}
+        self.action_index = {a: i for i, a in enumerate(self.actions)}
+        self.table = np.zeros((len(self.state_list), len(self.actions)), dtype=np.float32)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["journal"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def state_id(self, state):
+        """Row index for `state`, adding a zero row for states outside the configured list."""
+        idx = self.state_index.get(state)
+        if idx is None:
+            idx = len(self.state_list)
+            self.state_list.append(state)
+            self.state_index[state] = idx
+            self.table = np.vstack([self.table, np.zeros((1, len(self.actions)), dtype=np.float32)])
+        return idx
+
+    def state_ids(self, states):
+        return np.fromiter((self.state_id(s) for s in states), dtype=np.int64)
+
+    def action_ids(self, actions):
+        return np.fromiter((self.action_index[a] for a in actions), dtype=np.int64)
+
+    def set_q(self, state, action, q_value):
+        self.table[self.state_id(state), self.action_index[action]] = q_value
+
+    def to_dict(self):
+        return {
+            state: {a: float(v) for a, v in zip(self.actions, row)}
+            for state, row in zip(self.state_list, self.table)
+        }
+
+    def from_dict(self, q_dict):
+        self._init_table()
+        for state, values in q_dict.items():
+            row = self.state_id(state)  # May grow the table, so index it afterwards
+            self.table[row] = list(self._seeded_row(values).values())
+
+    def choose_action_ids(self, state_ids):
+        """Epsilon-greedy over rows with random tie-breaking, fully vectorized."""
+        q = self.table[state_ids]
+        best = q == q.max(axis=1, keepdims=True)
+        choice = np.where(best, self.rng.random(q.shape), -1.0).argmax(axis=1)
+        explore = self.rng.random(len(choice)) < self.epsilon
+        choice[explore] = self.rng.integers(0, len(self.actions), int(explore.sum()))
+        return choice
+
+    def choose_actions(self, states):
+        return [self.actions[i] for i in self.choose_action_ids(self.state_ids(states))]
+
+    def choose_action(self, state):
+        # Scalar path: the vectorized one costs more than the work for a single state
+        if self.rng.random() < self.epsilon:
+            return self.actions[self.rng.integers(len(self.actions))]
+        idx = self.state_id(state)  # May grow the table, so index it afterwards
+        row = self.table[idx].tolist()
+        best_value = max(row)
+        best = [i for i, v in enumerate(row) if v == best_value]
+        return self.actions[best[self.rng.integers(len(best))] if len(best) > 1 else best[0]]
+
+    def update_ids(self, state_ids, action_ids, rewards, next_state_ids):
+        """
+        Batched Q-update. TD targets use the table as it was at the start of the
+        batch, and every (state, action) pair moves once, by alpha times the
+        mean TD error of its transitions in the batch. A batch of one is the
+        sequential update; a batch repeating a pair is not the same as applying
+        those transitions one by one (which would move the pair k times), but an
+        averaged step towards their mean target, as in batch/expected updates.
+        Replay with large batches relies on this to stay stable; callers that
+        need sequential semantics should use `update`.
+        """
+        with self._lock:
+            n_actions = len(self.actions)
+            target = np.asarray(rewards, dtype=np.float32) + self.gamma * self.table[next_state_ids].max(axis=1)
+            td = target - self.table[state_ids, action_ids]
+            flat = state_ids * n_actions + action_ids
+            sums = np.bincount(flat, weights=td, minlength=self.table.size)
+            counts = np.bincount(flat, minlength=self.table.size)
+            touched = np.flatnonzero(counts)
+            q = self.table.reshape(-1)
+            q[touched] += (self.alpha * sums[touched] / counts[touched]).astype(np.float32)
+
+            if self.journal:
+                for cell in touched:
+                    row, col = divmod(int(cell), n_actions)
+                    self.journal.append(self.state_list[row], self.actions[col], float(q[cell]))
+
+    def update_batch(self, transitions):
+        """
+        Applies (state, action, reward, next_state) tuples in one vectorized
+        step; repeated pairs get their mean TD error, see `update_ids`.
+        """
+        if not transitions:
             return
-        try:
-            with open(filepath, "rb") as f:
-                q_dict = pickle.load(f)
-            self.Q = defaultdict(lambda: {a: 0.0 for a in self.actions}, q_dict)
-            print("✅ Q-table loaded.")
-        except Exception as e:
-            print(f"❌ Error loading Q-table: {e}")
\ No newline at end of file
+        states, actions, rewards, next_states = zip(*transitions)
+        self.update_ids(self.state_ids(states), self.action_ids(actions), rewards, self.state_ids(next_states))
+
+    def update(self, state, action, reward, next_state):
+        with self._lock:
+            row, col, next_row = self.state_id(state), self.action_index[action], self.state_id(next_state)
+            current_q = float(self.table[row, col])
+            new_q = current_q + self.alpha * (reward + self.gamma * max(self.table[next_row].tolist()) - current_q)
+            self.table[row, col] = new_q
+            if self.journal:
+                self.journal.append(state, action, float(self.table[row, col]))
+
+
+def create_agent(states, actions, backend="dict", **kwargs):
+    """Builds a Q-learning agent with the "dict" (default) or "array" table backend."""
+    if backend == "array":
+        return ArrayQLearningAgent(states, actions, **kwargs)
+    return QLearningAgent(states, actions, **kwargs)
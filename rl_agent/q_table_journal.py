@@ -0,0 +1,101 @@
+import os
+import json
+import pickle
+import threading
+
+
+def atomic_pickle(obj, filepath):
+    """Writes a pickle via temp file + fsync + rename, so a power cut leaves either the old or the new file."""
+    directory = os.path.dirname(filepath) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass  # Directory fsync is not available on every platform
+
+
+class QTableJournal:
+    """
+    Append-only log of Q-value writes next to a Q-table snapshot.
+    Each line records the resulting value of one (state, action) pair, so
+    replaying it over the snapshot is idempotent. Appends only go to the
+    file buffer; a background thread flushes and fsyncs them in batches.
+    """
+    def __init__(self, path, fsync_interval=2.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.records = sum(1 for _ in self.replay(path))
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._closed = threading.Event()
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._flusher, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def replay(path):
+        """Yields (state, action, q_value) records; a torn final line from a crash is skipped."""
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    yield record["s"], record["a"], float(record["q"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def append(self, state, action, q_value):
+        line = json.dumps({"s": state, "a": action, "q": q_value}) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._dirty = True
+            self.records += 1
+
+    def sync(self):
+        with self._lock:
+            if self._dirty and not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._dirty = False
+
+    @staticmethod
+    def discard(path):
+        """Empties the journal at `path`, e.g. once a snapshot written elsewhere supersedes it."""
+        if os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def reset(self):
+        """Empties the journal once a snapshot containing all its records is on disk."""
+        with self._lock:
+            self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+            self.records = 0
+
+    def _flusher(self):
+        while not self._closed.wait(self.fsync_interval):
+            try:
+                self.sync()
+            except OSError as e:
+                print(f"⚠️ Q-table journal sync error: {e}")
+
+    def close(self):
+        self._closed.set()
+        self.sync()
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,147 @@
+"""
+Offline replay trainer for the voice/music and music-category agents.
+
+Replays logged (and optionally synthetic) transitions through vectorized
+Q-updates and writes warm-started q_table.pkl / music_q_table.pkl files.
+Run from the repository root while the cradle is stopped, e.g.:
+
+    python -m rl_agent.replay_trainer --synthetic 1000000 --epochs 5
+"""
+import os
+import argparse
+import time
+import numpy as np
+from config import (
+    CATEGORIES, MUSIC_CATEGORIES, MAIN_ACTIONS, CALM_STATES, RL_TABLE_PATH, MUSIC_RL_TABLE_PATH, EXPERIENCE_LOG_DIR
+)
+from rl_agent.experience_log import COLUMNS, load_experience
+from rl_agent.q_learning_agent import ArrayQLearningAgent
+from rl_agent.q_table_journal import QTableJournal
+
+
+def synthetic_transitions(n, seed=0):
+    """
+    Simulated households: each (emotion, action) and (emotion, music category)
+    pair has a hidden probability of calming the baby. Calm outcomes earn 10,
+    continued distress -1, mirroring the live reward.
+    """
+    rng = np.random.default_rng(seed)
+    distress = np.array([i for i, c in enumerate(CATEGORIES) if c not in CALM_STATES])
+    calm = np.array([i for i, c in enumerate(CATEGORIES) if c in CALM_STATES])
+    p_main = rng.beta(2, 3, size=(len(CATEGORIES), len(MAIN_ACTIONS)))
+    p_music = rng.beta(2, 3, size=(len(CATEGORIES), len(MUSIC_CATEGORIES)))
+
+    state = rng.choice(distress, n)
+    action = rng.integers(0, len(MAIN_ACTIONS), n)
+    uses_music = np.isin(action, [i for i, a in enumerate(MAIN_ACTIONS) if "music" in a])
+    sub_action = np.where(uses_music, rng.integers(0, len(MUSIC_CATEGORIES), n), -1)
+    # Music alone calms by category; combined actions keep their own per-emotion odds
+    p_calm = np.where(action == MAIN_ACTIONS.index("music"), p_music[state, np.maximum(sub_action, 0)],
+                      p_main[state, action])
+    calmed = rng.random(n) < p_calm
+    return {
+        "state": state,
+        "action": action,
+        "sub_action": sub_action,
+        "reward": np.where(calmed, 10.0, -1.0).astype(np.float32),
+        "next_state": np.where(calmed, rng.choice(calm, n), rng.choice(distress, n)),
+        "confidence": np.ones(n, dtype=np.float32),
+        "timestamp": np.zeros(n),
+    }
+
+
+def concat_transitions(*datasets):
+    return {name: np.concatenate([d[name] for d in datasets]) for name in COLUMNS}
+
+
+def replay(agent, states, actions, rewards, next_states, epochs, batch_size, rng):
+    """Shuffled mini-batch replay through ArrayQLearningAgent.update_ids."""
+    n = len(states)
+    for _ in range(epochs):
+        order = rng.permutation(n)
+        for start in range(0, n, batch_size):
+            idx = order[start:start + batch_size]
+            agent.update_ids(states[idx], actions[idx], rewards[idx], next_states[idx])
+
+
+def train(data, epochs, batch_size, seed, warm_start, out_main, out_music, discard_journal=False):
+    """
+    Replays `data` into fresh (or, with warm_start, the existing) tables and
+    writes them to out_main/out_music. A journal next to an output holds
+    updates newer than its snapshot: warm_start folds them in, otherwise
+    training refuses to run unless discard_journal is set. The journals are
+    emptied once the new snapshots are written. Returns False when refused.
+    """
+    pending = {path: sum(1 for _ in QTableJournal.replay(path + ".journal")) for path in (out_main, out_music)}
+    if not warm_start and not discard_journal and any(pending.values()):
+        for path, records in pending.items():
+            if records:
+                print(f"❌ {path}.journal holds {records} Q-updates newer than the snapshot.")
+        print("   Pass --warm-start to train on top of them or --discard-journal to drop them.")
+        return False
+
+    rng = np.random.default_rng(seed)
+    main = ArrayQLearningAgent(CATEGORIES, MAIN_ACTIONS, seed=seed)
+    music = ArrayQLearningAgent(CATEGORIES, MUSIC_CATEGORIES, seed=seed)
+    if warm_start:
+        for agent, path in ((main, out_main), (music, out_music)):
+            agent.load(path)
+            agent.replay_journal(path)
+
+    valid = (data["state"] >= 0) & (data["next_state"] >= 0) & (data["action"] >= 0)
+    columns = {name: values[valid] for name, values in data.items()}
+    states = columns["state"].astype(np.int64)
+    next_states = columns["next_state"].astype(np.int64)
+
+    start = time.perf_counter()
+    replay(main, states, columns["action"].astype(np.int64), columns["reward"], next_states,
+           epochs, batch_size, rng)
+
+    is_music = columns["sub_action"] >= 0
+    replay(music, states[is_music], columns["sub_action"][is_music].astype(np.int64),
+           columns["reward"][is_music], next_states[is_music], epochs, batch_size, rng)
+    elapsed = time.perf_counter() - start
+
+    total = len(states) * epochs + int(is_music.sum()) * epochs
+    print(f"📈 Replayed {total:,} transition updates in {elapsed:.2f}s")
+
+    for agent, path in ((main, out_main), (music, out_music)):
+        agent.save(path)
+        # Folded in (warm start) or deliberately dropped; either way the snapshot supersedes it
+        QTableJournal.discard(path + ".journal")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-train Q-tables from logged or synthetic transitions.")
+    parser.add_argument("--log", default=EXPERIENCE_LOG_DIR, help="Experience log directory")
+    parser.add_argument("--synthetic", type=int, default=0, help="Number of synthetic transitions to add")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm-start", action="store_true",
+                        help="Start from the existing tables, including their journaled updates")
+    parser.add_argument("--discard-journal", action="store_true",
+                        help="Overwrite tables whose journal still holds updates (they are lost)")
+    parser.add_argument("--out-main", default=RL_TABLE_PATH)
+    parser.add_argument("--out-music", default=MUSIC_RL_TABLE_PATH)
+    args = parser.parse_args()
+
+    datasets = []
+    if args.log and os.path.isdir(args.log):
+        logged = load_experience(args.log, CATEGORIES, MAIN_ACTIONS, MUSIC_CATEGORIES)
+        print(f"📂 Loaded {len(logged['state']):,} logged transitions")
+        datasets.append(logged)
+    if args.synthetic:
+        datasets.append(synthetic_transitions(args.synthetic, args.seed))
+    if not datasets:
+        print("⚠️ No transitions to replay. Pass --log or --synthetic.")
+        return
+
+    # Stop the cradle first: it keeps appending to the journals of the live tables
+    train(concat_transitions(*datasets), args.epochs, args.batch_size, args.seed,
+          args.warm_start, args.out_main, args.out_music, args.discard_journal)
+
+
+if __name__ == "__main__":
+    main()
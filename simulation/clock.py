@@ -0,0 +1,85 @@
+import time
+import heapq
+import asyncio
+
+
+class RealClock:
+    """Wall-clock time: the controller's default."""
+    virtual = False
+
+    def now(self):
+        return time.monotonic()
+
+    def epoch(self, t=None):
+        """Unix time of the now() reading `t` (default: the current time)."""
+        return time.time() if t is None else t + (time.time() - time.monotonic())
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    def spawn(self, coro):
+        return asyncio.create_task(coro)
+
+
+class VirtualClock:
+    """
+    Discrete-event clock for simulations. Every task that sleeps on it is
+    parked; once all participating tasks (the caller of run plus everything
+    started with spawn) are parked, time jumps straight to the earliest wake-up.
+    `on_advance(t0, t1)` runs before each jump, e.g. to feed the audio of
+    (t0, t1] into the AudioBuffer. Participants must not await anything but
+    this clock, so blocking work is run inline while simulating. Timestamps
+    (`epoch`) count simulated seconds from `epoch_start`.
+    """
+    virtual = True
+
+    def __init__(self, on_advance=None, start=0.0, epoch_start=0.0):
+        self.t = start
+        self.epoch_start = epoch_start
+        self.on_advance = on_advance
+        self._sleepers = []   # (wake_time, seq, future)
+        self._seq = 0
+        self._active = 1      # The task driving the simulation
+        self.jumps = 0
+
+    def now(self):
+        return self.t
+
+    def epoch(self, t=None):
+        return self.epoch_start + (self.t if t is None else t)
+
+    async def sleep(self, seconds):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.t + max(0.0, seconds), self._seq, future))
+        self._seq += 1
+        self._active -= 1
+        self._advance()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done():
+                self._active += 1  # Never woken: undo the park so the count stays balanced
+            raise
+
+    def spawn(self, coro):
+        self._active += 1
+        task = asyncio.create_task(coro)
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task):
+        self._active -= 1
+        self._advance()
+
+    def _advance(self):
+        while self._active == 0 and self._sleepers:
+            wake, _, future = heapq.heappop(self._sleepers)
+            if future.cancelled():
+                continue
+            if wake > self.t:
+                if self.on_advance:
+                    self.on_advance(self.t, wake)
+                self.t = wake
+                self.jumps += 1
+            self._active += 1
+            future.set_result(None)
@@ -0,0 +1,97 @@
+from config import CATEGORIES, MUSIC_CATEGORIES, MUSIC_MAX_PLAY_SECONDS
+from rl_agent.q_learning_agent import create_agent
+
+WORDS_PER_SECOND = 2.5
+
+PHRASES = {
+    "hungry": "Shh, mommy is getting your milk ready, sweetheart.",
+    "tired": "Close your eyes, my little one. Mommy is right here.",
+    "default": "Shh, it's okay, my darling. Mommy is here with you.",
+}
+
+
+class NullSoother:
+    """
+    Stands in for ParentSoother without an LLM, TTS model or speakers. Each
+    utterance is logged with its estimated spoken duration and reported to
+    the audio source so a reactive scenario can respond.
+    """
+    def __init__(self, clock, source):
+        self.clock = clock
+        self.source = source
+        self.last_playback_start = None
+        self.tts_service = self   # SmartCradleSystem reads tts_service.last_playback_start
+        self.utterances = 0
+        self.seconds_spoken = 0.0
+
+    def soothe(self, emotion):
+        phrase = PHRASES.get(emotion, PHRASES["default"])
+        self.last_playback_start = self.clock.now()
+        self.utterances += 1
+        self.seconds_spoken += max(1.5, len(phrase.split()) / WORDS_PER_SECOND)
+        self.source.on_action("voice")
+
+
+class NullPlayback:
+    """PlaybackHandle counterpart that only tracks virtual time."""
+    def __init__(self, clock, category, max_duration):
+        self.clock = clock
+        self.category = category
+        self.started_at = clock.now()
+        self.max_duration = max_duration
+        self.stopped_at = None
+
+    def elapsed(self):
+        return (self.stopped_at or self.clock.now()) - self.started_at
+
+    def is_playing(self):
+        return self.stopped_at is None and self.elapsed() < self.max_duration
+
+    def stop(self, fade_ms=None):
+        if self.is_playing():
+            self.stopped_at = self.clock.now()
+
+
+class NullMusicPlayer:
+    """
+    Stands in for MusicPlayer: the real music agent picks the category, the
+    "song" only exists in virtual time. The agent's table lives at
+    `table_path` so simulations never touch the production tables.
+    """
+    def __init__(self, clock, source, table_path=None, epsilon=None):
+        self.clock = clock
+        self.source = source
+        self.table_path = table_path
+        self.agent = create_agent(states=CATEGORIES, actions=MUSIC_CATEGORIES)
+        if epsilon is not None:
+            self.agent.epsilon = epsilon
+        if table_path:
+            self.agent.load(table_path)
+        self.current = None
+        self.songs = 0
+        self.seconds_played = 0.0
+
+    def play_music(self, emotion, max_duration=MUSIC_MAX_PLAY_SECONDS, fade_ms=None):
+        self.stop()
+        category = self.agent.choose_action(emotion)
+        self.current = NullPlayback(self.clock, category, max_duration)
+        self.songs += 1
+        self.source.on_action("music", category)
+        return self.current
+
+    def is_playing(self):
+        return bool(self.current and self.current.is_playing())
+
+    def stop(self, fade_ms=None):
+        if self.current:
+            self.current.stop()
+            self.seconds_played += self.current.elapsed()
+            self.current = None
+
+    def update_agent(self, state, action, reward, next_state):
+        self.agent.update(state, action, reward, next_state)
+
+    def close(self):
+        self.stop()
+        if self.table_path:
+            self.agent.save(self.table_path)
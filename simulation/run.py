@@ -0,0 +1,111 @@
+"""
+Headless, faster-than-real-time simulation of the cradle.
+
+Drives the real classifier and RL agents with audio from WAV files or a
+synthetic cry scenario on a virtual clock, with soothing sent to null sinks
+instead of speakers. No audio hardware, LLM or TTS model is needed. Q-tables
+live in a scratch directory unless --tables-dir is given, e.g.:
+
+    python -m simulation.run --hours 8 --seed 1
+    python -m simulation.run --wav night1.wav night2.wav --epsilon 0
+    python -m simulation.run --hours 24 --tables-dir data/sim_tables --warm-start --json report.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from config import RL_TABLE_PATH, MUSIC_RL_TABLE_PATH
+from simulation.clock import VirtualClock
+from simulation.sources import WavSource, CryScenario
+from simulation.null_sink import NullSoother, NullMusicPlayer
+from telemetry.tracing import tracer
+
+
+class SimulationEnvironment:
+    """Everything SmartCradleSystem swaps out when simulating: clock, audio source, sinks and table paths."""
+    def __init__(self, source, tables_dir=None, epsilon=None, experience_dir=None, websocket=False):
+        self.clock = VirtualClock()
+        self.source = source
+        self.epsilon = epsilon
+        self.experience_dir = experience_dir
+        self.websocket = websocket
+        self.rl_table_path = os.path.join(tables_dir, "q_table.pkl") if tables_dir else None
+        music_table = os.path.join(tables_dir, "music_q_table.pkl") if tables_dir else None
+        self.soother = NullSoother(self.clock, source)
+        self.music_player = NullMusicPlayer(self.clock, source, music_table, epsilon)
+
+
+def simulate(environment, cry_classifier=None):
+    """Runs the controller until the source is exhausted. Returns the report dict."""
+    from system_controller import SmartCradleSystem
+
+    system = SmartCradleSystem(cry_classifier=cry_classifier, environment=environment)
+    start = time.perf_counter()
+    try:
+        asyncio.run(system.run_async())
+    finally:
+        system.shutdown()
+    wall = time.perf_counter() - start
+
+    simulated = environment.clock.now()
+    return {
+        "simulated_seconds": simulated,
+        "wall_seconds": wall,
+        "speedup": simulated / wall if wall else None,
+        "counters": dict(system.counters),
+        "gate": system.gate_stats(),
+        "source": environment.source.report(),
+        "voice": {"utterances": environment.soother.utterances,
+                  "seconds_spoken": environment.soother.seconds_spoken},
+        "music": {"songs": environment.music_player.songs,
+                  "seconds_played": environment.music_player.seconds_played},
+        "spans": tracer.snapshot(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate nights of cradle audio faster than real time.")
+    parser.add_argument("--wav", nargs="+", help="Replay these audio files instead of a synthetic scenario")
+    parser.add_argument("--hours", type=float, default=8.0, help="Length of the synthetic scenario")
+    parser.add_argument("--episodes-per-hour", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--epsilon", type=float, default=None, help="Override exploration, e.g. 0 to evaluate a policy")
+    parser.add_argument("--tables-dir", default=None, help="Keep the simulated Q-tables here (default: scratch dir)")
+    parser.add_argument("--warm-start", action="store_true", help="Start from copies of the production Q-tables")
+    parser.add_argument("--json", default=None, help="Write the report here")
+    args = parser.parse_args()
+
+    if args.wav:
+        source = WavSource(args.wav)
+    else:
+        source = CryScenario(args.hours * 3600, seed=args.seed, episodes_per_hour=args.episodes_per_hour)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        tables_dir = args.tables_dir or scratch
+        os.makedirs(tables_dir, exist_ok=True)
+        if args.warm_start:
+            for path in (RL_TABLE_PATH, MUSIC_RL_TABLE_PATH):
+                if os.path.exists(path):
+                    shutil.copy(path, os.path.join(tables_dir, os.path.basename(path)))
+        environment = SimulationEnvironment(source, tables_dir, args.epsilon)
+        report = simulate(environment)
+
+    print(f"\n🧪 Simulated {report['simulated_seconds'] / 3600:.2f}h in {report['wall_seconds']:.1f}s "
+          f"({report['speedup']:.0f}x real time)")
+    print(f"   Counters: {report['counters']}")
+    print(f"   Source:   {report['source']}")
+    if report["gate"]:
+        print(f"   Gate:     {report['gate']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, default=str)
+        print(f"💾 Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import numpy as np
+from config import SAMPLE_RATE, CATEGORIES, MUSIC_CATEGORIES, MAIN_ACTIONS
+from audio import synthetic
+
+
+class WavSource:
+    """Replays audio files back to back at SAMPLE_RATE (mono), optionally looping."""
+    def __init__(self, paths, loop=False):
+        import librosa
+        self.audio = np.concatenate([
+            librosa.load(path, sr=SAMPLE_RATE, mono=True)[0].astype(np.float32) for path in paths
+        ])
+        self.loop = loop
+        self.position = 0
+        self.duration = None if loop else len(self.audio) / SAMPLE_RATE
+
+    def read(self, n):
+        """Next `n` samples; fewer (possibly none) once a non-looping source is exhausted."""
+        if self.loop and len(self.audio):
+            chunk = self.audio[(self.position + np.arange(n)) % len(self.audio)]
+            self.position = (self.position + n) % len(self.audio)
+            return chunk
+        chunk = self.audio[self.position:self.position + n]
+        self.position += len(chunk)
+        return chunk
+
+    def on_action(self, action, category=None):
+        """Recorded audio does not react to soothing."""
+
+    def report(self):
+        return {"source": "wav", "seconds": self.position / SAMPLE_RATE}
+
+
+class CryScenario:
+    """
+    Synthetic night that reacts to soothing. The baby is calm (quiet room
+    noise) until a cry episode starts, at `episodes_per_hour` on average.
+    While crying, every soothing action calms it after a few seconds with a
+    hidden per-(cause, action) probability, music also depending on the
+    category. Voice and music started at the same moment count as the
+    combined "voice_music" action. Otherwise it calms on its own at
+    `self_soothe_per_minute`.
+    Time-to-calm per episode is what a policy should minimise.
+    """
+    def __init__(self, duration, seed=0, episodes_per_hour=4.0, self_soothe_per_minute=0.05,
+                 calm_delay=(2.0, 8.0)):
+        self.duration = duration
+        self.rng = np.random.default_rng(seed)
+        self.episode_rate = episodes_per_hour / 3600.0
+        self.self_soothe_rate = self_soothe_per_minute / 60.0
+        self.calm_delay = calm_delay
+
+        causes = [c for c in CATEGORIES if c not in ("silence", "laugh", "noise")]
+        self.causes = causes
+        self.p_action = {c: dict(zip(MAIN_ACTIONS, self.rng.beta(2, 3, len(MAIN_ACTIONS)))) for c in causes}
+        self.p_music = {c: dict(zip(MUSIC_CATEGORIES, self.rng.beta(2, 3, len(MUSIC_CATEGORIES)))) for c in causes}
+
+        self.second = 0           # Simulated seconds generated so far
+        self.pending = np.empty(0, dtype=np.float32)
+        self.cause = None         # Current cry cause, None while calm
+        self.calm_at = None       # Scheduled end of the episode after a successful action
+        self.episode_start = None
+        self.episodes = []        # (cause, start, end, actions taken)
+        self._actions = []
+        self._requested = []      # (action, category) reported since the last step
+
+    def _resolve_actions(self):
+        requested, self._requested = self._requested, []
+        if self.cause is None or self.calm_at is not None or not requested:
+            return
+        actions = {action for action, _ in requested}
+        category = next((c for _, c in requested if c is not None), None)
+        action = "voice_music" if {"voice", "music"} <= actions else requested[0][0]
+        self._actions.append(action if category is None else f"{action}:{category}")
+
+        p = self.p_action[self.cause].get(action, 0.0)
+        if action == "music" and category is not None:
+            p = self.p_music[self.cause].get(category, 0.0)
+        if self.rng.random() < p:
+            self.calm_at = self.second + self.rng.uniform(*self.calm_delay)
+
+    def _step(self):
+        """Advances the baby's state by one second and returns that second of audio."""
+        self._resolve_actions()
+        t = self.second
+        if self.cause is None:
+            if self.rng.random() < self.episode_rate:
+                self.cause = self.rng.choice(self.causes)
+                self.episode_start = t
+                self._actions = []
+        elif (self.calm_at is not None and t >= self.calm_at) or self.rng.random() < self.self_soothe_rate:
+            self.episodes.append((self.cause, self.episode_start, t, list(self._actions)))
+            self.cause = None
+            self.calm_at = None
+
+        seed = int(self.rng.integers(1 << 31))
+        self.second += 1
+        if self.cause is None:
+            return synthetic.noise(1.0, -65.0, seed)
+        return synthetic.cry_bursts(1.0, seed)
+
+    def read(self, n):
+        while len(self.pending) < n and self.second < self.duration:
+            self.pending = np.concatenate((self.pending, self._step()))
+        chunk, self.pending = self.pending[:n], self.pending[n:]
+        return chunk
+
+    def on_action(self, action, category=None):
+        """Called by the null sinks when soothing plays; takes effect from the next second of audio."""
+        self._requested.append((action, category))
+
+    def report(self):
+        durations = [end - start for _, start, end, _ in self.episodes]
+        return {
+            "source": "scenario",
+            "seconds": self.second,
+            "episodes": len(self.episodes),
+            "mean_time_to_calm": float(np.mean(durations)) if durations else None,
+            "p90_time_to_calm": float(np.percentile(durations, 90)) if durations else None,
+            "crying_fraction": float(sum(durations) / max(self.second, 1)),
+        }
@@ -1,51 +1,299 @@
-import time
+import asyncio
 import random
-import sounddevice as sd
-import pygame  # Added to handle music stopping
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from config import *
 
 from audio.audio_utils import AudioBuffer
-from cry_model.cry_classifier import CryClassifier
-from rl_agent.q_learning_agent import QLearningAgent
-from tts_soother.parent_soother import ParentSoother
-from music.music_player import MusicPlayer
+from audio.activity_gate import SilenceGate, OnsetDetector
+from audio.output_mixer import OutputMixer, WhiteNoiseSource
+from cry_model.cadence import CadenceScheduler
+from rl_agent.q_learning_agent import create_agent
+from rl_agent.experience_log import ExperienceLog
 from websocket_server.server import WebSocketServer
+from websocket_server.feature_stream import FeatureStream
+from telemetry.tracing import tracer
+from simulation.clock import RealClock
+
+# Heavy subsystems (TensorFlow, Coqui TTS/torch, pygame) are imported inside their loaders,
+# and sounddevice only where a real device is opened, so simulation runs without PortAudio
+PROCESS_START = time.monotonic()
+
+
+class StartupProfile:
+    """Start and end of each startup phase in seconds since the controller module was imported."""
+    def __init__(self, t0=PROCESS_START):
+        self.t0 = t0
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic() - self.t0
+        try:
+            yield
+        finally:
+            end = time.monotonic() - self.t0
+            with self._lock:
+                self.phases[name] = {"start": start, "end": end, "duration": end - start}
+
+    def mark(self, name):
+        """Records a point in time, e.g. the first detection."""
+        now = time.monotonic() - self.t0
+        with self._lock:
+            self.phases.setdefault(name, {"start": now, "end": now, "duration": 0.0})
+
+    def report(self):
+        with self._lock:
+            return dict(sorted(self.phases.items(), key=lambda item: item[1]["start"]))
+
+    def print_report(self, title="Startup profile"):
+        print(f"⏱️ {title}:")
+        for name, phase in self.report().items():
+            print(f"   {name:<22} {phase['start']:7.2f}s → {phase['end']:7.2f}s  ({phase['duration']:.2f}s)")
+
 
 class SmartCradleSystem:
-    def __init__(self):
+    def __init__(self, cry_classifier=None, environment=None, soother=None, cradle=None):
+        """
+        cry_classifier: optional shared classifier, e.g. a MicroBatchScheduler.client(...)
+        when several cradles run in one process, or a host.clients.RemoteClassifier.
+        Loaded per instance otherwise.
+        soother: optional stand-in for ParentSoother, e.g. a host.clients.RemoteSoother.
+        cradle: optional host.cradles.CradleSpec giving this cradle's audio
+        devices, WebSocket port and data directory (Q-tables, experience log).
+        environment: optional simulation.run.SimulationEnvironment. Audio then
+        comes from its source on a virtual clock, soothing goes to its null
+        sinks and nothing touches audio devices or the production Q-tables.
+
+        Only light components are built here. The classifier, the parent
+        soother (LLM + TTS) and the music player load concurrently in the
+        background; monitoring starts as soon as the classifier is ready and
+        actions whose subsystem is still loading are not chosen.
+        """
         print("🚀 Initializing Smart Soothing System...")
-        
+        self.startup = StartupProfile()
+        self.loader = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+        self.environment = environment
+        self.clock = environment.clock if environment else RealClock()
+        self.cradle = cradle
+        self.counters = Counter()  # predictions, interventions, actions and rewards
+
         self.audio_buffer = AudioBuffer(SEGMENT_SIZE)
-        
-        print("⏳ Starting WebSocket Server...")
-        self.ws_server = WebSocketServer(WS_HOST, WS_PORT)
-        
-        print("⏳ Loading Cry Classifier...")
-        self.cry_classifier = CryClassifier(CRY_MODEL_PATH, CATEGORIES)
-        
-        print("⏳ Loading Main RL Agent (Voice vs Music)...")
-        self.agent = QLearningAgent(CATEGORIES, ["voice", "music"])
-        self.agent.load(RL_TABLE_PATH)
-        
-        print("⏳ Initializing Parent Soother...")
-        self.soother = ParentSoother(
-            llm_model=LLM_MODEL_NAME,
-            tts_model=TTS_MODEL_NAME,
-            parent_name="Mommy",
-            parent_voice_path=PARENT_VOICE_PATH
+        # Classification rate follows the room: slow while steadily calm, immediate on an onset.
+        # Capped a tick short of the window length so every sample lands in some classified window
+        self.cadence = CadenceScheduler(max_interval=min(CADENCE_MAX_INTERVAL, SEGMENT_DURATION - CADENCE_TICK))
+        self.onset_detector = OnsetDetector() if ONSET_ENABLED else None
+        self.ws_server = WebSocketServer(
+            WS_HOST, cradle.ws_port if cradle else WS_PORT, WS_CODEC, WS_CLIENT_QUEUE, WS_QUEUE_POLICY,
+            metrics_path=METRICS_PATH if tracer.enabled else None,
+            metrics_provider=self.prometheus_metrics if tracer.enabled else None
         )
-        
-        print("⏳ Initializing Music Player...")
-        self.music_player = MusicPlayer()
-        
+
+        self.cry_classifier = cry_classifier
+        self.feature_stream = None
+        self.soother = None
+        self.music_player = None
+
+        # One output stream for speech and music; started together with the microphone stream.
+        # A host cradle always uses it: it is the only output that honours the cradle's speaker
+        self.output_mixer = OutputMixer(
+            OUTPUT_SAMPLE_RATE, OUTPUT_CHANNELS, OUTPUT_BLOCKSIZE, OUTPUT_DUCK_GAIN, OUTPUT_DUCK_MS,
+            device=cradle.output_device if cradle else None
+        ) if (OUTPUT_MIXER_ENABLED or cradle) and not environment else None
+
+        # Slowest first: the classifier gates time-to-first-detection
+        self.classifier_ready = self.loader.submit(self._load_classifier) if cry_classifier is None else None
+        if environment:
+            self.soother = environment.soother
+            self.music_player = environment.music_player
+            self.soother_ready = self.music_ready = None
+        elif soother is not None:
+            self.soother = soother
+            self.soother_ready = None
+            self.music_ready = self.loader.submit(self._load_music_player)
+        else:
+            self.soother_ready = self.loader.submit(self._load_soother)
+            self.music_ready = self.loader.submit(self._load_music_player)
+
+        with self.startup.phase("rl agent"):
+            if environment:
+                self.rl_table_path = environment.rl_table_path
+            else:
+                self.rl_table_path = cradle.path("q_table.pkl") if cradle else RL_TABLE_PATH
+            self.agent = create_agent(CATEGORIES, MAIN_ACTIONS, backend=RL_AGENT_BACKEND)
+            if self.rl_table_path:
+                self.agent.load(
+                    self.rl_table_path,
+                    journal=RL_JOURNAL_ENABLED and not environment,
+                    fsync_interval=RL_JOURNAL_FSYNC_INTERVAL,
+                    checkpoint_every=RL_CHECKPOINT_EVERY
+                )
+            if environment and environment.epsilon is not None:
+                self.agent.epsilon = environment.epsilon
+
+            # Every transition (including the music sub-action) is logged for offline replay training
+            if environment:
+                experience_dir = environment.experience_dir
+            else:
+                experience_dir = cradle.path("experience") if cradle else EXPERIENCE_LOG_DIR
+            self.experience_log = ExperienceLog(
+                experience_dir, CATEGORIES, MAIN_ACTIONS, MUSIC_CATEGORIES,
+                flush_interval=EXPERIENCE_LOG_FLUSH_INTERVAL
+            ) if EXPERIENCE_LOG_ENABLED and experience_dir else None
+
         self.stream = None
         self.running = False
+        self.loop = None
+        self.intervention = None
+        self.first_detection = None
+        # Blocking model calls and playback run here so the event loop keeps monitoring
+        self.inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.action_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="action")
+
+    def _load_classifier(self):
+        print("⏳ Loading Cry Classifier...")
+        with self.startup.phase("import tensorflow"):
+            from cry_model.cry_classifier import CryClassifier
+        with self.startup.phase("cry classifier"):
+            self.cry_classifier = CryClassifier(
+                CRY_MODEL_PATH,
+                CATEGORIES,
+                backend=CRY_INFERENCE_BACKEND,
+                quantization=CRY_TFLITE_QUANTIZATION,
+                gate=SilenceGate() if GATE_ENABLED else None
+            )
+        return self.cry_classifier
+
+    def _load_soother(self):
+        print("⏳ Initializing Parent Soother...")
+        with self.startup.phase("import tts"):
+            from tts_soother.parent_soother import ParentSoother
+            from tts_soother.audio_cache import SynthesisCache
+        with self.startup.phase("parent soother"):
+            self.soother = ParentSoother(
+                llm_model=LLM_MODEL_NAME,
+                tts_model=TTS_MODEL_NAME,
+                parent_name="Mommy",
+                parent_voice_path=PARENT_VOICE_PATH,
+                tts_cache=SynthesisCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_CACHE_MEMORY_BYTES) if TTS_CACHE_ENABLED else None,
+                prewarm_fallbacks=TTS_PREWARM_FALLBACKS,
+                tts_streaming=TTS_STREAMING,
+                voice_cache_dir=VOICE_CACHE_DIR,
+                output_mixer=self.output_mixer,
+                phrase_pool={
+                    "pool_emotions": [c for c in CATEGORIES if c not in CALM_STATES],
+                    "pool_depth": LLM_POOL_DEPTH,
+                    "pool_ttl": LLM_POOL_TTL,
+                    "pool_concurrency": LLM_POOL_CONCURRENCY,
+                    "pool_refresh": LLM_POOL_REFRESH
+                }
+            )
+        return self.soother
+
+    def _load_music_player(self):
+        print("⏳ Initializing Music Player...")
+        with self.startup.phase("music player"):
+            from music.music_player import MusicPlayer
+            self.music_player = MusicPlayer(
+                self.output_mixer, self.cradle.path("music_q_table.pkl") if self.cradle else MUSIC_RL_TABLE_PATH
+            )
+        return self.music_player
+
+    def _action_ready(self, action):
+        needs_voice = "voice" in action
+        needs_music = "music" in action
+        return (not needs_voice or self.soother is not None) and (not needs_music or self.music_player is not None)
+
+    def _report_when_loaded(self):
+        """
+        Prints the startup profile once every background loader has finished.
+        Done-callbacks rather than a waiting thread, so shutting down mid-startup
+        (which cancels pending loaders) never blocks on it.
+        """
+        pending = {f for f in (self.classifier_ready, self.soother_ready, self.music_ready) if f}
+        lock = threading.Lock()
+
+        def _done(future):
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                print(f"❌ Subsystem failed to load: {future.exception()}")
+            with lock:
+                pending.discard(future)
+                if pending:
+                    return
+            self.startup.mark("all subsystems ready")
+            self.startup.print_report()
+
+        if not pending:
+            self.startup.mark("all subsystems ready")
+            self.startup.print_report()
+        for future in list(pending):
+            future.add_done_callback(_done)
+
+    def startup_report(self):
+        """Per-phase startup timings, seconds since process start."""
+        return self.startup.report()
+
+    def prometheus_metrics(self):
+        """Span histograms plus WebSocket client and startup gauges, in Prometheus text format."""
+        clients = self.ws_server.client_stats()
+        extra = {
+            "ws_clients": len(clients),
+            "ws_client_dropped": [({"client": c["client"]}, c["dropped"]) for c in clients],
+            "ws_client_max_lag_seconds": [({"client": c["client"]}, c["max_lag"]) for c in clients],
+        }
+        if self.first_detection is not None:
+            extra["startup_first_detection_seconds"] = self.first_detection
+        extra["poll_interval_seconds"] = self.cadence.interval
+        gate = self.gate_stats()
+        if gate:
+            extra["gate_checked"] = gate["checked"]
+            extra["gate_skipped"] = gate["skipped"]
+            extra["gate_skip_ratio"] = gate["skip_ratio"]
+        return tracer.prometheus_text(extra)
+
+    def gate_stats(self):
+        """Silence gate counters (checked, skipped, skip_ratio), or None when there is no gate."""
+        gate = getattr(self.cry_classifier, "gate", None)
+        return gate.stats() if gate is not None else None
+
+    async def _metrics_loop(self):
+        """Periodically broadcasts span percentiles as a "metrics" message."""
+        while self.running:
+            await self.clock.sleep(METRICS_INTERVAL)
+            self.ws_server.broadcast_data({"type": "metrics", "spans": tracer.snapshot()})
 
     def _detect_posture(self):
         return random.choice(["safe", "risky"])
 
+    def _feed_audio(self, t0, t1):
+        """Virtual clock hook: writes the source's audio for (t0, t1] into the buffer."""
+        n = int(round(t1 * SAMPLE_RATE)) - int(round(t0 * SAMPLE_RATE))
+        samples = self.environment.source.read(n)
+        self.audio_buffer.write(samples)
+        if len(samples) < n:
+            self.running = False  # Source exhausted: the simulation is over
+
+    async def _offload(self, executor, fn, *args):
+        """Runs blocking work off the event loop, or inline under a virtual clock to keep it deterministic."""
+        if self.clock.virtual:
+            return fn(*args)
+        return await self.loop.run_in_executor(executor, fn, *args)
+
     def start_audio_stream(self):
+        if self.environment:
+            self.clock.on_advance = self._feed_audio
+            print("🎙️ Simulated audio source attached")
+            return
+        import sounddevice as sd
+
         self.stream = sd.InputStream(
+            device=self.cradle.input_device if self.cradle else None,
             channels=1,
             samplerate=SAMPLE_RATE,
             callback=self.audio_buffer.callback,
@@ -55,89 +303,199 @@ class SmartCradleSystem:
         print("🎙️ Audio Stream Started")
 
     def run(self):
-        self.ws_server.start()
+        """Blocking entry point: runs the async controller until interrupted."""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    async def run_async(self):
+        if not self.environment or self.environment.websocket:
+            self.ws_server.start()
+        if self.output_mixer:
+            self.output_mixer.start()
+            if WHITE_NOISE_LEVEL_DB is not None:
+                self.output_mixer.add(WhiteNoiseSource(
+                    self.output_mixer.channels, WHITE_NOISE_LEVEL_DB,
+                    fade_in_frames=self.output_mixer.frames(WHITE_NOISE_FADE_MS / 1000.0)
+                ))
+                print(f"🌫️ White-noise bed at {WHITE_NOISE_LEVEL_DB:.0f} dBFS")
+        # The microphone fills the buffer while the classifier is still loading
         self.start_audio_stream()
         self.running = True
-        
+        self.loop = asyncio.get_running_loop()
+        self._report_when_loaded()
+
+        if self.classifier_ready is not None:
+            await asyncio.wrap_future(self.classifier_ready)
+        self.startup.mark("classifier ready")
+
+        # Live spectrogram for subscribed clients, reusing the classifier's streaming features
+        self.feature_stream = FeatureStream(
+            self.ws_server, self.cry_classifier.extractor(), FEATURE_STREAM_MEL_BANDS
+        ) if FEATURE_STREAM_ENABLED else None
+
         print("✅ System Operational. Listening for cries...")
-        
-        # Define states that are considered "Calm/Safe"
-        CALM_STATES = ["silence", "laugh", "noise"]
+        if tracer.enabled and not self.environment:
+            self.clock.spawn(self._metrics_loop())
 
-        try:
-            while self.running:
-                time.sleep(1) 
-                
-                segment = self.audio_buffer.get_audio_segment()
-                if len(segment) < SEGMENT_SIZE:
+        # Monitoring never waits on soothing: interventions run as separate tasks
+        await self._monitor_loop()
+
+    async def _predict(self, segment, position):
+        """Runs the classifier off the event loop."""
+        self.counters["predictions"] += 1
+        return await self._offload(self.inference_executor, self.cry_classifier.predict, segment, position)
+
+    def _onset(self, position):
+        """Feeds audio written since `position` to the onset detector. Returns (onset, new position)."""
+        samples, position = self.audio_buffer.get_samples_since(position)
+        return self.onset_detector.update(samples), position
+
+    async def _monitor_loop(self):
+        last_emotion = None
+        onset_position = self.audio_buffer.total_samples
+        next_due = self.clock.now()
+        while self.running:
+            await self.clock.sleep(CADENCE_TICK if self.onset_detector else self.cadence.interval)
+
+            if self.onset_detector:
+                onset, onset_position = self._onset(onset_position)
+                if onset:
+                    self.counters["onsets"] += 1
+                    self.cadence.onset()
+                    next_due = self.clock.now()
+                if self.clock.now() < next_due:
                     continue
 
-                # 1. Predict Initial Emotion (Current State)
-                current_emotion, confidence = self.cry_classifier.predict(segment)
-                posture = self._detect_posture()
-                
-                # Broadcast data to WebSocket
-                self.ws_server.broadcast_data({
-                    "emotion": current_emotion,
-                    "confidence": confidence,
-                    "posture": posture,
-                    "is_calm": current_emotion in CALM_STATES
-                })
-
-                # --- THE FILTER GATE ---
-                # If baby is in a calm state, display status and skip soothing
-                if current_emotion in CALM_STATES:
+            with tracer.span("audio_snapshot"):
+                segment, position = self.audio_buffer.snapshot()
+            if len(segment) < SEGMENT_SIZE:
+                continue
+            detected_at = self.clock.now()
+
+            # 1. Predict Initial Emotion (Current State)
+            current_emotion, confidence = await self._predict(segment, position)
+            next_due = self.clock.now() + self.cadence.observe(current_emotion, confidence)
+            posture = self._detect_posture()
+            if self.first_detection is None:
+                self.startup.mark("first detection")
+                self.first_detection = self.startup.phases["first detection"]["start"]
+                print(f"⏱️ First detection {self.first_detection:.2f}s after start")
+
+            # Broadcast data to WebSocket
+            self.ws_server.broadcast_data({
+                "emotion": current_emotion,
+                "confidence": confidence,
+                "posture": posture,
+                "is_calm": current_emotion in CALM_STATES
+            })
+            if self.feature_stream and self.ws_server.subscribers():
+                # Same thread as the classifier, which owns the StreamingMFCC
+                await self._offload(self.inference_executor, self.feature_stream.publish, segment, position)
+
+            # --- THE FILTER GATE ---
+            # If baby is in a calm state, display status and skip soothing
+            if current_emotion in CALM_STATES:
+                if current_emotion != last_emotion:
                     print(f"✅ Baby is Calm ({current_emotion}). Monitoring...")
-                    
-                    # Optional: Stop music if it was playing from a previous cry
-                    if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
-                        self.music_player.stop()
-                        
-                    time.sleep(15) # Wait before next check
-                    continue # Jump back to start of while loop
-                
-                # --- ACTION LOGIC (Only runs for distress states) ---
-                else:
-                    print(f"🚨 Distress detected: {current_emotion} ({confidence:.2f})")
-                    
-                    # 2. Decide main action (Voice vs Music)
-                    action = self.agent.choose_action(current_emotion)
-                    print(f"🤖 Main Agent Decided: {action}")
-
-                    chosen_music_category = None
-                    if action == "voice":
-                        self.soother.soothe(current_emotion)
-                    elif action == "music":
-                        chosen_music_category = self.music_player.play_music(current_emotion)
-                    
-                    # 3. Wait and observe the effect
-                    print("⏳ Soothing applied. Waiting 10s to observe effect...")
-                    time.sleep(10)
-                    
-                    # 4. Measure the Next State
-                    next_segment = self.audio_buffer.get_audio_segment()
-                    next_emotion, next_conf = self.cry_classifier.predict(next_segment)
-                    
-                    # 5. Calculate Reward (Modified as requested)
-                    if next_emotion in ["silence", "laugh", "noise"]:
-                        reward = 10  # Highly successful
-                    elif next_emotion in ["discomfort", "tired", "lonely", "hungry", "belly pain", "scared", "burping"]:
-                        reward = -1  # Still in distress
-                    else:
-                        reward = 0   # Changed state but not silent
-                    
-                    # 6. Update Agents
-                    self.agent.update(current_emotion, action, reward, next_emotion)
-                    self.agent.save(RL_TABLE_PATH)
-                    
-                    # Update Low-Level Music Agent (if music was used)
-                    if action == "music" and chosen_music_category:
-                        self.music_player.update_agent(current_emotion, chosen_music_category, reward, next_emotion)
-                    
-                    print(f"📈 RL Updated | State: {current_emotion} -> Next: {next_emotion} | Reward: {reward}")
 
-        except KeyboardInterrupt:
-            self.shutdown()
+                # Stop music as soon as the baby is calm, even mid-intervention
+                if self.music_player and self.music_player.is_playing():
+                    self.music_player.stop()
+
+            # --- ACTION LOGIC (Only runs for distress states) ---
+            elif self.intervention is None or self.intervention.done():
+                print(f"🚨 Distress detected: {current_emotion} ({confidence:.2f})")
+                self.intervention = self.clock.spawn(self._intervene(current_emotion, confidence, detected_at))
+
+            last_emotion = current_emotion
+
+    async def _intervene(self, current_emotion, confidence, detected_at=None):
+        """
+        Applies one soothing action, observes the effect and updates the agents.
+        `detected_at` (clock time of the snapshot that showed distress) is used
+        to trace cry-to-sound latency.
+        """
+        try:
+            # 2. Decide main action (Voice vs Music)
+            with tracer.span("agent_decision"):
+                action = self.agent.choose_action(current_emotion)
+            print(f"🤖 Main Agent Decided: {action}")
+            if not self._action_ready(action):
+                available = [a for a in MAIN_ACTIONS if self._action_ready(a)]
+                if not available:
+                    print("⏳ Soothing subsystems are still loading. Skipping intervention.")
+                    return
+                action = random.choice(available)
+                print(f"⏳ Still loading, using {action} instead")
+
+            self.counters["interventions"] += 1
+            self.counters[f"action.{action}"] += 1
+            chosen_music_category = None
+            if action == "voice":
+                await self._offload(self.action_executor, self.soother.soothe, current_emotion)
+                # soothe returns after speaking; the TTS service stamps when the voice became audible
+                started = self.soother.tts_service.last_playback_start
+                if started is not None and detected_at is not None:
+                    tracer.record("cry_to_sound", started - detected_at)
+            elif action == "music":
+                # Returns as soon as the song starts; calm readings or max duration stop it
+                playback = await self._offload(self.action_executor, self.music_player.play_music, current_emotion)
+                chosen_music_category = playback.category if playback else None
+                if playback and detected_at is not None:
+                    tracer.record("cry_to_sound", self.clock.now() - detected_at)
+            elif action == "voice_music":
+                # Music bed first; the mixer ducks it while the parent's voice plays
+                playback = await self._offload(self.action_executor, self.music_player.play_music, current_emotion)
+                chosen_music_category = playback.category if playback else None
+                if playback and detected_at is not None:
+                    tracer.record("cry_to_sound", self.clock.now() - detected_at)
+                await self._offload(self.action_executor, self.soother.soothe, current_emotion)
+
+            # 3. Wait and observe the effect (monitoring keeps running meanwhile)
+            print(f"⏳ Soothing applied. Waiting {OBSERVATION_WINDOW}s to observe effect...")
+            await self.clock.sleep(OBSERVATION_WINDOW)
+
+            # 4. Measure the Next State
+            evaluation_started = time.perf_counter()
+            next_segment, next_position = self.audio_buffer.snapshot()
+            next_emotion, next_conf = await self._predict(next_segment, next_position)
+
+            # 5. Calculate Reward (Modified as requested)
+            if next_emotion in ["silence", "laugh", "noise"]:
+                reward = 10  # Highly successful
+            elif next_emotion in ["discomfort", "tired", "lonely", "hungry", "belly pain", "scared", "burping"]:
+                reward = -1  # Still in distress
+            else:
+                reward = 0   # Changed state but not silent
+            tracer.record("reward_evaluation", time.perf_counter() - evaluation_started)
+            self.counters[f"reward.{reward}"] += 1
+
+            # 6. Update Agents (file writes stay off the event loop)
+            self.agent.update(current_emotion, action, reward, next_emotion)
+            if self.rl_table_path:
+                await self._offload(self.action_executor, self.agent.save, self.rl_table_path)
+
+            # Update Low-Level Music Agent (if music was used)
+            if chosen_music_category:
+                await self._offload(
+                    self.action_executor, self.music_player.update_agent,
+                    current_emotion, chosen_music_category, reward, next_emotion
+                )
+
+            if self.experience_log:
+                # On the controller's clock, so simulated runs log their simulated timeline
+                self.experience_log.log(
+                    current_emotion, action, chosen_music_category, reward, next_emotion, confidence,
+                    self.clock.epoch()
+                )
+
+            print(f"📈 RL Updated | State: {current_emotion} -> Next: {next_emotion} | Reward: {reward}")
+        except Exception as e:
+            print(f"❌ Intervention error: {e}")
 
     def shutdown(self):
         print("\n🛑 Shutting down system...")
@@ -145,4 +503,18 @@ class SmartCradleSystem:
         if self.stream:
             self.stream.stop()
             self.stream.close()
-        print("👋 Goodbye.")
\ No newline at end of file
+        self.loader.shutdown(wait=False, cancel_futures=True)
+        self.inference_executor.shutdown(wait=False)
+        self.action_executor.shutdown(wait=False)
+        self.agent.close()
+        gate = self.gate_stats()
+        if gate and gate["checked"]:
+            print(f"🔇 Silence gate skipped {gate['skipped']} of {gate['checked']} classifications "
+                  f"({gate['skip_ratio']:.0%})")
+        if self.experience_log:
+            self.experience_log.close()
+        if self.music_player:
+            self.music_player.close()
+        if self.output_mixer:
+            self.output_mixer.close()
+        print("👋 Goodbye.")
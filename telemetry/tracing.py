@@ -0,0 +1,151 @@
+import time
+import threading
+from contextlib import contextmanager
+from config import TRACING_ENABLED
+
+# Log-linear buckets: exact below 2**SUB_BITS microseconds, then 2**SUB_BITS buckets per power of two
+# (at most ~3% relative error), up to 2**MAX_EXP microseconds (~1.2 hours).
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+MAX_EXP = 32
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """HDR-style latency histogram with a fixed, small memory footprint. Values are seconds."""
+    def __init__(self):
+        self.counts = [0] * (SUB_COUNT * (MAX_EXP - SUB_BITS + 2))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _index(us):
+        if us < SUB_COUNT:
+            return us
+        us = min(us, (1 << (MAX_EXP + 1)) - 1)
+        exp = us.bit_length() - 1
+        shift = exp - SUB_BITS
+        return SUB_COUNT + shift * SUB_COUNT + ((us >> shift) & (SUB_COUNT - 1))
+
+    @staticmethod
+    def _bounds(index):
+        """[low, high) of a bucket in microseconds."""
+        if index < SUB_COUNT:
+            return index, index + 1
+        shift, mantissa = divmod(index - SUB_COUNT, SUB_COUNT)
+        low = (SUB_COUNT + mantissa) << shift
+        return low, low + (1 << shift)
+
+    def record(self, seconds):
+        us = max(0, int(seconds * 1e6))
+        index = self._index(us)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-quantile (0..1), in seconds."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index, n in enumerate(self.counts):
+                seen += n
+                if n and seen >= rank:
+                    return min(self._bounds(index)[1] / 1e6, self.max)
+            return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            **{f"p{int(q * 100)}": self.percentile(q) for q in QUANTILES},
+        }
+
+
+class _NullSpan:
+    """Shared no-op span handed out while tracing is disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Named latency spans recorded into Histograms. When disabled, span() returns
+    a shared no-op context manager and record() returns at once, so the
+    instrumentation costs one attribute check.
+    """
+    def __init__(self, enabled=False, prefix="cradle"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).record(time.perf_counter() - start)
+
+    def snapshot(self):
+        """{span: {count, mean, max, p50, p90, p99}} in seconds."""
+        return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def prometheus_text(self, extra=None):
+        """
+        Prometheus text exposition: one summary per span plus optional extra
+        gauges given as {metric_name: value} or {metric_name: [(labels_dict, value), ...]}.
+        """
+        metric = f"{self.prefix}_span_seconds"
+        lines = [f"# HELP {metric} Latency of control-loop stages.", f"# TYPE {metric} summary"]
+        for name, summary in self.snapshot().items():
+            for q in QUANTILES:
+                lines.append(f'{metric}{{span="{name}",quantile="{q}"}} {summary[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {summary["mean"] * summary["count"]:.6f}')
+            lines.append(f'{metric}_count{{span="{name}"}} {summary["count"]}')
+
+        for name, value in (extra or {}).items():
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full_name} gauge")
+            if isinstance(value, list):
+                for labels, v in value:
+                    label_text = ",".join(f'{k}="{val}"' for k, val in labels.items())
+                    lines.append(f"{full_name}{{{label_text}}} {v}")
+            else:
+                lines.append(f"{full_name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide tracer used by every instrumented component
+tracer = Tracer(TRACING_ENABLED)
@@ -0,0 +1,136 @@
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+_digests = {}
+
+
+def file_digest(path):
+    """SHA-256 of a file's content, memoized on (path, mtime, size)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if memo_key not in _digests:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _digests[memo_key] = h.hexdigest()
+    return _digests[memo_key]
+
+
+class SynthesisCache:
+    """
+    Content-addressed cache of synthesized waveforms.
+    An in-memory LRU sits in front of an on-disk store of .npz files; both
+    are capped by size and evict least recently used entries first.
+    """
+    def __init__(self, cache_dir, max_disk_bytes, max_memory_bytes):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._memory = OrderedDict()  # key -> (waveform, sample_rate)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text, speaker_wav, model_name, language):
+        """Hash of (cleaned text, speaker wav content, model name, language)."""
+        speaker = file_digest(speaker_wav) if speaker_wav and os.path.exists(speaker_wav) else ""
+        h = hashlib.sha256()
+        for part in (text, speaker, model_name, language):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _remember(self, key, wav, sr):
+        """Adds an entry to the memory LRU. Caller holds the lock."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = (wav, sr)
+        self._memory_bytes += wav.nbytes
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, (old_wav, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= old_wav.nbytes
+
+    def get(self, key):
+        """Returns (waveform, sample_rate) or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                wav, sr = data["wav"], int(data["sr"])
+            os.utime(path)  # mtime doubles as the disk LRU timestamp
+        except Exception as e:
+            if not isinstance(e, FileNotFoundError):
+                # Truncated or corrupt entry (e.g. zipfile.BadZipFile): drop it and synthesize again
+                print(f"⚠️ Discarding unreadable TTS cache entry {os.path.basename(path)}: {e}")
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._remember(key, wav, sr)
+        return wav, sr
+
+    def put(self, key, wav, sr):
+        wav = np.asarray(wav, dtype=np.float32)
+        path = self._path(key)
+        tmp_path = None
+        try:
+            # Unique per writer: prewarm, live synthesis and the host's speech workers can put one key at once
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, wav=wav, sr=np.int32(sr))
+            os.replace(tmp_path, path)
+            tmp_path = None
+            self._evict_disk()
+        except OSError as e:
+            print(f"⚠️ TTS cache write error: {e}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        with self._lock:
+            self._remember(key, wav, sr)
+
+    def _evict_disk(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Removed by another writer meanwhile
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
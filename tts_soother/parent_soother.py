@@ -1,19 +1,67 @@
 import os
+import hashlib
+from .audio_cache import file_digest
 from .services import LLMService, TTSService
 
+# Bump when preprocess_voice changes so cached voices are rebuilt
+VOICE_PREPROCESS_PARAMS = "sr=16000|top_db=20|median-gate|normalize"
+
 class ParentSoother:
-    def __init__(self, llm_model, tts_model, parent_name, parent_voice_path):
+    def __init__(self, llm_model, tts_model, parent_name, parent_voice_path, tts_cache=None, prewarm_fallbacks=False,
+                 tts_streaming=False, phrase_pool=None, voice_cache_dir=None, output_mixer=None, tts_service=None):
         self.parent_voice_path = parent_voice_path
         self.processed_voice_path = "processed_parent.wav"
+        self.voice_cache_dir = voice_cache_dir
         
         # Composition: Soother HAS-A LLMService and TTSService
-        self.llm_service = LLMService(llm_model, parent_name)
-        self.tts_service = TTSService(tts_model)
+        # phrase_pool: optional LLMService pool settings (pool_emotions, pool_depth, pool_ttl, ...)
+        self.llm_service = LLMService(llm_model, parent_name, **(phrase_pool or {}))
+        # tts_service: optional TTSService shared by several soothers (one per cradle on a host)
+        self.tts_service = tts_service or TTSService(
+            tts_model, cache=tts_cache, streaming=tts_streaming, output_mixer=output_mixer
+        )
 
         # Pre-process voice once at startup if available
         if self.parent_voice_path and os.path.exists(self.parent_voice_path):
+            if self.voice_cache_dir:
+                self._load_cached_voice()
+            else:
+                self.tts_service.preprocess_voice(self.parent_voice_path, self.processed_voice_path)
+
+        # Fallback phrases are the common case when the LLM is down, so synthesize them ahead of time
+        if prewarm_fallbacks:
+            self.tts_service.prewarm(list(self.llm_service.fallback_phrases.values()), self._voice_file())
+
+    def _load_cached_voice(self):
+        """
+        Reuses the processed voice and its speaker embedding from disk, keyed by a
+        hash of the source recording and the preprocessing parameters.
+        Both are rebuilt only when the parent voice changes.
+        """
+        os.makedirs(self.voice_cache_dir, exist_ok=True)
+        key = hashlib.sha256(
+            f"{file_digest(self.parent_voice_path)}|{VOICE_PREPROCESS_PARAMS}".encode("utf-8")
+        ).hexdigest()[:16]
+        self.processed_voice_path = os.path.join(self.voice_cache_dir, f"processed_{key}.wav")
+
+        if os.path.exists(self.processed_voice_path):
+            print("✅ Using cached processed parent voice")
+        else:
             self.tts_service.preprocess_voice(self.parent_voice_path, self.processed_voice_path)
 
+        if os.path.exists(self.processed_voice_path):
+            self.tts_service.load_speaker_embedding(self.processed_voice_path, self.voice_cache_dir)
+
+    def _voice_file(self):
+        """Use processed voice if available, otherwise raw path (or None)."""
+        return self.processed_voice_path if os.path.exists(self.processed_voice_path) else self.parent_voice_path
+
+    def render(self, emotion):
+        """Generates a phrase and synthesizes it without playing. Returns (phrase, waveform, sample_rate)."""
+        phrase = self.llm_service.generate_phrase(emotion)
+        wav, sr = self.tts_service.get_waveform(self.tts_service.clean_text(phrase), self._voice_file())
+        return phrase, wav, sr
+
     def soothe(self, emotion):
         """Orchestrates the soothing process."""
         # 1. Generate Text
@@ -21,11 +69,8 @@ class ParentSoother:
         print(f"📝 Generated phrase: {phrase}")
 
         # 2. Synthesize and Play
-        # Use processed voice if available, otherwise raw path (or None)
-        voice_file = self.processed_voice_path if os.path.exists(self.processed_voice_path) else self.parent_voice_path
-        
         self.tts_service.synthesize_and_play(
             text=phrase, 
             output_file="output_soothe.wav", 
-            speaker_wav=voice_file
+            speaker_wav=self._voice_file()
         )
\ No newline at end of file
@@ -1,12 +1,20 @@
+import io
 import os
+import hashlib
 import re
+import queue
+import threading
 import unicodedata
 import numpy as np
 import librosa
 import soundfile as sf
 import pygame
 import time
-from TTS.api import TTS
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .audio_cache import file_digest
+from audio.output_mixer import QueueSource
+from telemetry.tracing import tracer
 
 # Optional Imports for LLM
 try:
@@ -17,12 +25,15 @@ except ImportError:
 
 class LLMService:
     """Handles text generation using local LLM with a robust static fallback."""
-    def __init__(self, model_name, parent_name):
+    def __init__(self, model_name, parent_name, pool_emotions=None, pool_depth=0, pool_ttl=3600,
+                 pool_concurrency=1, pool_refresh=30):
         self.model_name = model_name
         self.parent_name = parent_name
         self.llm = None
+        self.chain = None
         self._init_fallbacks()
         self._init_llm()
+        self._init_pool(pool_emotions or [], pool_depth, pool_ttl, pool_concurrency, pool_refresh)
 
     def _init_fallbacks(self):
         """Predefined ~100-word soothing sentences for when the LLM is unavailable."""
@@ -93,42 +104,200 @@ class LLMService:
                     ("system", system_instruction),
                     ("human", "{human}"),
                 ])
+                # Built once and reused by every generation
+                self.chain = self.prompt | self.llm
                 print(f"✅ LLM Service ready: {self.model_name}")
             except Exception as e:
                 print(f"❌ LLM Init Failed: {e}. Falling back to predefined phrases.")
         else:
             print("⚠️ 'langchain_ollama' not installed. Using fallback text.")
     
+    def _init_pool(self, emotions, depth, ttl, concurrency, refresh):
+        """
+        Per-emotion pool of ready phrases, refilled by a background worker so the
+        LLM never sits on the cry-response path. Disabled when depth is 0.
+        """
+        self.pool_depth = depth
+        self.pool_ttl = ttl
+        self.pool_concurrency = concurrency
+        self.pool_refresh = refresh
+        self._pool = {emotion: deque() for emotion in emotions}  # emotion -> (phrase, created_at)
+        self._pool_pending = {emotion: 0 for emotion in emotions}
+        self._pool_lock = threading.Lock()
+        self._pool_wakeup = threading.Event()
+        self._pool_thread = None
+        if self.chain and depth > 0 and emotions:
+            self._pool_thread = threading.Thread(target=self._pool_worker, daemon=True)
+            self._pool_thread.start()
+            print(f"🧺 Phrase pool started ({depth} per emotion, {len(emotions)} emotions)")
+
+    def _invoke(self, emotion):
+        response = self.chain.invoke({"human": f"The baby is feeling: {emotion}"})
+        return response.content
+
+    def _pool_worker(self):
+        with ThreadPoolExecutor(max_workers=self.pool_concurrency) as executor:
+            while True:
+                jobs = []
+                now = time.monotonic()
+                with self._pool_lock:
+                    for emotion, phrases in self._pool.items():
+                        while phrases and now - phrases[0][1] > self.pool_ttl:
+                            phrases.popleft()
+                    # Round-robin so every emotion gets its first phrase before any gets a second
+                    for _ in range(self.pool_depth):
+                        for emotion, phrases in self._pool.items():
+                            if len(phrases) + self._pool_pending[emotion] < self.pool_depth:
+                                self._pool_pending[emotion] += 1
+                                jobs.append(emotion)
+                for emotion in jobs:
+                    executor.submit(self._refill_one, emotion)
+
+                self._pool_wakeup.wait(timeout=self.pool_refresh)
+                self._pool_wakeup.clear()
+
+    def _refill_one(self, emotion):
+        try:
+            phrase = self._invoke(emotion)
+            with self._pool_lock:
+                self._pool[emotion].append((phrase, time.monotonic()))
+        except Exception as e:
+            print(f"⚠️ Phrase pool refill failed for '{emotion}': {e}")
+        finally:
+            with self._pool_lock:
+                self._pool_pending[emotion] -= 1
+
+    def _take_pooled(self, emotion):
+        """O(1) dequeue of the oldest non-expired phrase, or None when the pool is empty."""
+        now = time.monotonic()
+        with self._pool_lock:
+            phrases = self._pool.get(emotion)
+            while phrases:
+                phrase, created_at = phrases.popleft()
+                if now - created_at <= self.pool_ttl:
+                    return phrase
+        return None
+
+    def pool_sizes(self):
+        with self._pool_lock:
+            return {emotion: len(phrases) for emotion, phrases in self._pool.items()}
+
     def generate_phrase(self, emotion):
         """Attempts to generate via LLM, but instantly falls back to predefined phrases on failure."""
-        if self.llm:
-            try:
-                chain = self.prompt | self.llm
-                response = chain.invoke({"human": f"The baby is feeling: {emotion}"})
-                return response.content
-            except Exception as e:
-                print(f"⚠️ LLM Generation Error during runtime: {e}. Using fallback.")
-        
-        # If LLM is not initialized or threw an error, use the fallback dictionary
-        return self.fallback_phrases.get(emotion, self.fallback_phrases["default"])
+        with tracer.span("llm_generation"):
+            if self._pool_thread:
+                phrase = self._take_pooled(emotion)
+                self._pool_wakeup.set()  # Ask the worker to top the pool back up
+                if phrase:
+                    return phrase
+            elif self.chain:
+                try:
+                    return self._invoke(emotion)
+                except Exception as e:
+                    print(f"⚠️ LLM Generation Error during runtime: {e}. Using fallback.")
+
+            # If LLM is not initialized, threw an error, or the pool is empty, use the fallback dictionary
+            return self.fallback_phrases.get(emotion, self.fallback_phrases["default"])
 
 
 class TTSService:
     """Handles Text-to-Speech synthesis and Audio Processing."""
-    def __init__(self, model_name, device="cpu"):
+    def __init__(self, model_name, device="cpu", cache=None, language="en", streaming=False, output_mixer=None):
         self.model_name = model_name
+        self.language = language  # Crucial parameter for YourTTS
         self.synthesizer = None
+        # Optional SynthesisCache; when set, waveforms are synthesized once and replayed from memory
+        self.cache = cache
+        # Sentence-pipelined mode: play sentence N while sentence N+1 is being synthesized
+        self.streaming = streaming
+        # Optional OutputMixer; speech then plays on its "voice" bus and ducks any music under it
+        self.output_mixer = output_mixer
+        self.last_timing = None
+        self.last_playback_start = None  # time.monotonic() when the last utterance became audible
+        self._speak_started = 0.0
+        self._speaker_names = {}  # absolute wav path -> speaker name its cached embedding is registered under
+        self._synth_lock = threading.Lock()  # The TTS model is not safe to call from two threads
         self._init_tts(device)
 
     def _init_tts(self, device):
         try:
             print(f"🔄 Loading TTS Model ({self.model_name}). This may take a while...")
+            # Imported here so torch only loads with the model, after the LLM side is up
+            from TTS.api import TTS
             # gpu=False is usually required for Mac M1/M2 and Raspberry Pi for this specific library
             self.synthesizer = TTS(model_name=self.model_name, gpu=False) 
             print(f"✅ TTS Service ready")
         except Exception as e:
             print(f"❌ TTS Init Failed: {e}")
 
+    def _speaker_manager(self):
+        synthesizer = getattr(self.synthesizer, "synthesizer", None)
+        return getattr(getattr(synthesizer, "tts_model", None), "speaker_manager", None)
+
+    def load_speaker_embedding(self, wav_path, cache_dir):
+        """
+        Loads (or computes and stores) the speaker embedding for `wav_path` and
+        registers it as a named speaker, so synthesis passes `speaker=` to the
+        public TTS API instead of re-encoding the clip every time.
+        """
+        manager = self._speaker_manager()
+        if manager is None or not hasattr(manager, "compute_embedding_from_clip"):
+            print("⚠️ TTS model has no speaker encoder. Skipping embedding cache.")
+            return None
+
+        key = hashlib.sha256(f"{file_digest(wav_path)}|{self.model_name}".encode("utf-8")).hexdigest()[:16]
+        embedding_path = os.path.join(cache_dir, f"embedding_{key}.npy")
+        try:
+            if os.path.exists(embedding_path):
+                embedding = np.load(embedding_path)
+                print("✅ Loaded cached speaker embedding")
+            else:
+                with self._synth_lock:
+                    embedding = np.asarray(manager.compute_embedding_from_clip(wav_path), dtype=np.float32)
+                tmp_path = embedding_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, embedding)
+                os.replace(tmp_path, embedding_path)
+                print("💾 Speaker embedding cached")
+        except Exception as e:
+            print(f"⚠️ Speaker embedding error: {e}")
+            return None
+
+        name = f"cached_voice_{key}"
+        if self._register_speaker(manager, name, embedding):
+            self._speaker_names[os.path.abspath(wav_path)] = name
+        else:
+            print("⚠️ This TTS version cannot take a precomputed speaker embedding; "
+                  "the voice clip is re-encoded on every synthesis")
+        return embedding
+
+    def _register_speaker(self, manager, name, embedding):
+        """
+        Adds `embedding` to the model's d-vector table (the one its built-in
+        speakers come from) so `tts(speaker=name)` uses it. False when the model
+        does not look up speakers that way, so nothing was changed.
+        """
+        config = getattr(getattr(self.synthesizer, "synthesizer", None), "tts_config", None)
+        by_name = getattr(manager, "embeddings_by_names", None)
+        if not getattr(config, "use_d_vector_file", False) or not isinstance(by_name, dict) \
+                or not callable(getattr(manager, "get_mean_embedding", None)):
+            return False
+        by_name[name] = [embedding.tolist()]
+        try:
+            if np.allclose(manager.get_mean_embedding(name), embedding):
+                return True
+        except Exception as e:
+            print(f"⚠️ Speaker registration check failed: {e}")
+        by_name.pop(name, None)
+        return False
+
+    def _speaker_args(self, speaker_wav):
+        """TTS keyword arguments selecting the voice: the registered speaker when there is one."""
+        if not (self.synthesizer.is_multi_speaker and speaker_wav):
+            return {}
+        name = self._speaker_names.get(os.path.abspath(speaker_wav))
+        return {"speaker": name} if name else {"speaker_wav": speaker_wav}
+
     def preprocess_voice(self, input_path, output_path, sr=16000):
         """Cleans and normalizes the parent's voice sample."""
         try:
@@ -159,22 +328,94 @@ class TTSService:
         text = re.sub(r"[^a-zA-Z0-9.,!?'\- ]+", " ", text)
         return re.sub(r"\s+", " ", text).strip()
 
+    def _synthesize(self, cleaned_text, speaker_wav=None):
+        """Synthesizes to memory. Returns (waveform, sample_rate)."""
+        args = {"text": cleaned_text, "language": self.language, **self._speaker_args(speaker_wav)}
+        with self._synth_lock, tracer.span("tts_synthesis"):
+            try:
+                wav = self.synthesizer.tts(**args)
+            except Exception as e:
+                if "speaker" not in args:
+                    raise
+                # Registered speaker rejected: fall back to encoding the clip from now on
+                print(f"⚠️ Cached speaker embedding rejected ({e}); using the voice clip")
+                self._speaker_names.pop(os.path.abspath(speaker_wav), None)
+                args.pop("speaker")
+                wav = self.synthesizer.tts(**args, speaker_wav=speaker_wav)
+        return np.asarray(wav, dtype=np.float32), self.synthesizer.synthesizer.output_sample_rate
+
+    def split_sentences(self, cleaned_text, min_chars=20):
+        """Splits on sentence punctuation, merging fragments too short for YourTTS to voice well."""
+        sentences = []
+        for part in re.split(r"(?<=[.!?])\s+", cleaned_text):
+            if sentences and len(sentences[-1]) < min_chars:
+                sentences[-1] = f"{sentences[-1]} {part}"
+            elif part:
+                sentences.append(part)
+        return sentences
+
+    def get_waveform(self, cleaned_text, speaker_wav=None):
+        """Returns (waveform, sample_rate) from the cache, synthesizing and storing it on a miss."""
+        if self.cache is None:
+            return self._synthesize(cleaned_text, speaker_wav)
+        key = self.cache.make_key(cleaned_text, speaker_wav, self.model_name, self.language)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        wav, sr = self._synthesize(cleaned_text, speaker_wav)
+        self.cache.put(key, wav, sr)
+        return wav, sr
+
+    def prewarm(self, texts, speaker_wav=None):
+        """Synthesizes `texts` into the cache on a background thread."""
+        if not self.synthesizer or self.cache is None:
+            return None
+
+        def _work():
+            for text in texts:
+                cleaned_text = self.clean_text(text)
+                # Streaming mode looks up the cache sentence by sentence
+                chunks = self.split_sentences(cleaned_text) if self.streaming else [cleaned_text]
+                for chunk in chunks:
+                    try:
+                        self.get_waveform(chunk, speaker_wav)
+                    except Exception as e:
+                        print(f"⚠️ TTS pre-warm error: {e}")
+            print(f"🔥 TTS cache pre-warmed ({len(texts)} phrases)")
+
+        thread = threading.Thread(target=_work, daemon=True)
+        thread.start()
+        return thread
+
     def synthesize_and_play(self, text, output_file, speaker_wav=None):
+        """Speaks `text`. With a cache, plays from memory and `output_file` is not written."""
         if not self.synthesizer:
             print("⚠️ TTS not available.")
             return
 
         cleaned_text = self.clean_text(text)
         print(f"🗣️ Speaking: '{cleaned_text}'")
-        
+        self._speak_started = time.perf_counter()
+        self.last_playback_start = None
+
+        if self.streaming:
+            self.speak_streaming(cleaned_text, speaker_wav)
+            return
+
+        if self.cache is not None or self.output_mixer is not None:
+            try:
+                wav, sr = self.get_waveform(cleaned_text, speaker_wav)
+                self._play_waveform(wav, sr)
+            except Exception as e:
+                print(f"❌ Synthesis error: {e}")
+            return
+
         args = {
             "text": cleaned_text, 
             "file_path": output_file,
-            "language": "en"  # Crucial parameter for YourTTS
+            "language": self.language,
+            **self._speaker_args(speaker_wav)
         }
-        
-        if self.synthesizer.is_multi_speaker and speaker_wav:
-            args["speaker_wav"] = speaker_wav
 
         try:
             self.synthesizer.tts_to_file(**args)
@@ -182,11 +423,115 @@ class TTSService:
         except Exception as e:
             print(f"❌ Synthesis error: {e}")
 
-    def _play_audio(self, file_path):
+    def speak_streaming(self, cleaned_text, speaker_wav=None):
+        """
+        Synthesizes sentence by sentence on a worker thread while the previous
+        sentence plays, writing waveforms straight to the audio output.
+        Returns and stores the timing report for the call.
+        """
+        sentences = self.split_sentences(cleaned_text)
+        chunks = queue.Queue(maxsize=2)
+        stopped = threading.Event()  # Set once the consumer gives up, so the producer never blocks on put
+
+        def _put(item):
+            while not stopped.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def _produce():
+            try:
+                for sentence in sentences:
+                    if stopped.is_set() or not _put(self.get_waveform(sentence, speaker_wav)):
+                        return
+            except Exception as e:
+                _put(e)
+            _put(None)
+
+        start = time.perf_counter()
+        threading.Thread(target=_produce, daemon=True).start()
+
+        first_audio = None
+        stream = None
+        voice = None
+        try:
+            while True:
+                item = chunks.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    print(f"❌ Synthesis error: {item}")
+                    break
+                wav, sr = item
+                if first_audio is None:
+                    first_audio = time.perf_counter() - start
+                    self._mark_playback_start()
+                if self.output_mixer is not None:
+                    if voice is None:
+                        voice = self.output_mixer.add(QueueSource(self.output_mixer.channels, bus="voice"))
+                    voice.append(self._to_mixer_rate(wav, sr))
+                    continue
+                if stream is None:
+                    import sounddevice as sd
+                    stream = sd.OutputStream(samplerate=sr, channels=1, dtype="float32")
+                    stream.start()
+                stream.write(wav.reshape(-1, 1))
+        except Exception as e:
+            print(f"⚠️ Playback error: {e}")
+        finally:
+            stopped.set()
+            if voice is not None:
+                voice.finish()
+                self.output_mixer.wait(voice)
+            if stream is not None:
+                stream.stop()  # Returns once the queued audio has played
+                stream.close()
+
+        self.last_timing = {
+            "sentences": len(sentences),
+            "time_to_first_audio": first_audio,
+            "total_time": time.perf_counter() - start,
+        }
+        if first_audio is not None:
+            print(f"⏱️ TTS first audio after {first_audio:.2f}s, total {self.last_timing['total_time']:.2f}s "
+                  f"({len(sentences)} sentences)")
+        return self.last_timing
+
+    def _mark_playback_start(self):
+        if self.last_playback_start is None:
+            self.last_playback_start = time.monotonic()
+            tracer.record("playback_start.voice", time.perf_counter() - self._speak_started)
+
+    def _to_mixer_rate(self, wav, sr):
+        if sr == self.output_mixer.sample_rate:
+            return wav
+        return librosa.resample(np.asarray(wav, dtype=np.float32), orig_sr=sr, target_sr=self.output_mixer.sample_rate)
+
+    def _play_waveform(self, wav, sr):
+        """Plays an in-memory waveform, through the output mixer when there is one, else as an in-memory WAV."""
+        if self.output_mixer is not None:
+            try:
+                source = self.output_mixer.play(wav, sr, bus="voice")
+                self._mark_playback_start()
+                self.output_mixer.wait(source)
+            except Exception as e:
+                print(f"⚠️ Playback error: {e}")
+            return
+        buffer = io.BytesIO()
+        sf.write(buffer, wav, sr, format="WAV")
+        buffer.seek(0)
+        self._play_audio(buffer, "wav")
+
+    def _play_audio(self, source, namehint=""):
         try:
-            pygame.mixer.init()
-            pygame.mixer.music.load(file_path)
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            pygame.mixer.music.load(source, namehint)
             pygame.mixer.music.play()
+            self._mark_playback_start()
             while pygame.mixer.music.get_busy():
                 time.sleep(0.1)
         except Exception as e:
@@ -0,0 +1,95 @@
+import struct
+import numpy as np
+import scipy.fft
+from config import SAMPLE_RATE, N_MFCC
+from cry_model.features import StreamingMFCC, HOP_LENGTH, TOP_DB
+
+# Binary frame message, little-endian:
+#   magic b"FEAT", kind (0 = log-mel, 1 = MFCC), dtype (0 = float16, 1 = uint8),
+#   n_bands (uint16), n_frames (uint16), hop between sent frames in samples (uint32),
+#   centre sample of the first frame (int64), lo and hi (float32: uint8 values map linearly to [lo, hi])
+# followed by n_frames x n_bands values (frame-major), then n_frames float16 RMS levels in dBFS.
+HEADER = struct.Struct("<4sBBHHIqff")
+MAGIC = b"FEAT"
+KINDS = {"mel": 0, "mfcc": 1}
+DTYPES = {"float16": 0, "uint8": 1}
+
+
+class FeatureStream:
+    """
+    Pushes live log-mel or MFCC frames plus RMS levels to subscribed
+    WebSocket clients as compact binary messages. Frames come from the cry
+    classifier's StreamingMFCC, so only audio it has not seen yet is
+    analysed. Each subscriber picks a frame rate; frames are decimated on
+    absolute frame numbers and every distinct (features, format, rate)
+    message is encoded once per update, however many clients share it.
+    """
+    def __init__(self, server, extractor=None, mel_bands=32):
+        self.server = server
+        # The classifier's extractor when it streams features, otherwise a private one
+        self.extractor = extractor or StreamingMFCC()
+        self.mel_bands = mel_bands
+        self.frame_rate = SAMPLE_RATE / HOP_LENGTH
+        self.last_centre = -1
+        self.messages = 0
+
+    def decimation(self, fps):
+        return max(1, int(round(self.frame_rate / max(float(fps), 1e-3))))
+
+    def _encode(self, features, fmt, log_mel, centres, rms_db, top, step):
+        keep = (centres // HOP_LENGTH) % step == 0
+        if not keep.any():
+            return None
+        columns = log_mel[:, keep]
+        if features == "mfcc":
+            data = scipy.fft.dct(np.maximum(columns, top - TOP_DB), axis=0, type=2, norm="ortho")[:N_MFCC]
+            lo, hi = float(data.min()), float(data.max())
+        else:
+            group = max(1, columns.shape[0] // self.mel_bands)
+            data = columns[:group * (columns.shape[0] // group)]
+            data = data.reshape(-1, group, data.shape[1]).mean(axis=1)
+            lo, hi = float(top - TOP_DB), float(top)
+        data = np.clip(data.T, lo, hi)
+
+        if fmt == "uint8":
+            payload = np.round((data - lo) * (255.0 / max(hi - lo, 1e-6))).astype(np.uint8)
+        else:
+            payload = data.astype(np.float16)
+        header = HEADER.pack(MAGIC, KINDS[features], DTYPES[fmt], payload.shape[1], payload.shape[0],
+                             step * HOP_LENGTH, int(centres[keep][0]), lo, hi)
+        return header + payload.tobytes() + rms_db[keep].astype(np.float16).tobytes()
+
+    def publish(self, audio, end_position):
+        """
+        Sends the frames added since the last call to every subscriber. Call it
+        from the thread that runs the classifier, since both use the extractor.
+        """
+        subscribers = self.server.subscribers()
+        if not subscribers:
+            return 0
+        if self.extractor.last_end_position != end_position:
+            # Gated (silent) windows skip the classifier; reuses every cached column
+            self.extractor.extract(audio, end_position)
+        log_mel, centres = self.extractor.log_mel_since(self.last_centre)
+        if not len(centres):
+            return 0
+        self.last_centre = int(centres[-1])
+
+        # RMS over the hop around each frame centre
+        window_start = int(end_position) - len(audio)
+        first = int(centres[0]) - window_start - HOP_LENGTH // 2
+        block = audio[first:first + len(centres) * HOP_LENGTH].reshape(len(centres), HOP_LENGTH)
+        rms_db = 20 * np.log10(np.sqrt(np.mean(block.astype(np.float64) ** 2, axis=1)) + 1e-10)
+        top = float(self.extractor.last_log_mel.max())
+
+        encoded = {}
+        deliveries = []
+        for channel, subscription in subscribers:
+            key = (subscription["features"], subscription["format"], self.decimation(subscription["fps"]))
+            if key not in encoded:
+                encoded[key] = self._encode(*key[:2], log_mel, centres, rms_db, top, key[2])
+            if encoded[key] is not None:
+                deliveries.append((channel, encoded[key]))
+        self.server.send_to(deliveries)
+        self.messages += len(encoded)
+        return len(deliveries)
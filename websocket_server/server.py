@@ -1,38 +1,154 @@
 import asyncio
 import websockets
 import json
+import http
+import time
+from collections import deque
 from threading import Thread
 
+# Optional faster encoders
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def make_encoder(codec):
+    """
+    Returns a function turning a dict into a WebSocket payload. "json" and
+    "orjson" produce text frames; "msgpack" produces binary frames. Falls back
+    to json when the requested library is not installed.
+    """
+    if codec == "orjson" and orjson is not None:
+        return lambda data: orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+    if codec == "msgpack" and msgpack is not None:
+        return lambda data: msgpack.packb(data, use_bin_type=True)
+    if codec not in ("json", "orjson", "msgpack"):
+        print(f"⚠️ Unknown WebSocket codec '{codec}', using json")
+    return lambda data: json.dumps(data, default=float)
+
+
+class ClientChannel:
+    """
+    Outgoing queue of one client, drained by its own writer task so a slow
+    client only ever delays itself. When full, "drop_oldest" discards the
+    oldest pending message and "coalesce" replaces the newest pending one, so
+    the client always catches up to the latest state.
+    """
+    def __init__(self, websocket, max_queue=32, policy="drop_oldest"):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.policy = policy
+        self.pending = deque()    # (enqueued_at, message)
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.last_lag = 0.0       # Seconds the last sent message waited in the queue
+        self.max_lag = 0.0
+        self.task = None
+        self.closed = False
+        self._closing = None
+        self.subscription = None  # Live feature stream settings, see WebSocketServer._handle_message
+
+    def push(self, message, enqueued_at):
+        if self.closed:
+            return
+        if len(self.pending) >= self.max_queue:
+            self.dropped += 1
+            if self.policy == "coalesce":
+                self.pending.pop()
+            else:
+                self.pending.popleft()
+        self.pending.append((enqueued_at, message))
+        self.ready.set()
+
+    async def writer(self):
+        try:
+            while True:
+                await self.ready.wait()
+                while self.pending:
+                    enqueued_at, message = self.pending.popleft()
+                    await self.websocket.send(message)
+                    self.last_lag = time.monotonic() - enqueued_at
+                    self.max_lag = max(self.max_lag, self.last_lag)
+                    self.sent += 1
+                self.ready.clear()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            print(f"⚠️ WebSocket send to {self.websocket.remote_address} failed: {e}")
+        finally:
+            self.closed = True
+            self.pending.clear()
+            # Ends the handler's receive loop, which unregisters the client (no-op once closed)
+            self._closing = asyncio.ensure_future(self.websocket.close())
+
+    def stats(self):
+        return {
+            "client": str(self.websocket.remote_address),
+            "queued": len(self.pending),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "subscription": self.subscription,
+        }
+
+
 class WebSocketServer:
-    def __init__(self, host, port):
+    def __init__(self, host, port, codec="json", max_queue=32, queue_policy="drop_oldest",
+                 metrics_path=None, metrics_provider=None):
         self.host = host
         self.port = port
-        self.clients = set()
+        self.clients = {}         # websocket -> ClientChannel
         self.loop = None
         self._thread = None
+        self.encode = make_encoder(codec)
+        self.max_queue = max_queue
+        self.queue_policy = queue_policy
+        # Plain HTTP GET on metrics_path answers with metrics_provider() (Prometheus text) on the same port
+        self.metrics_path = metrics_path
+        self.metrics_provider = metrics_provider
 
     async def _handler(self, websocket):
-        self.clients.add(websocket)
+        channel = ClientChannel(websocket, self.max_queue, self.queue_policy)
+        channel.task = asyncio.create_task(channel.writer())
+        self.clients[websocket] = channel
         print(f"📡 New Client Connected! (Total: {len(self.clients)})")
         try:
             async for msg in websocket:
-                print(f"📨 Received: {msg}")
+                self._handle_message(channel, msg)
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
-            self.clients.remove(websocket)
-            print("❌ Client Disconnected")
+            self.clients.pop(websocket, None)
+            channel.task.cancel()
+            print(f"❌ Client Disconnected (sent {channel.sent}, dropped {channel.dropped})")
 
     async def _run_server(self):
         """Main coroutine to run the server."""
         print(f"⏳ Starting WebSocket on ws://{self.host}:{self.port}...")
         # Capture the loop so we can use it for threadsafe broadcasting later
         self.loop = asyncio.get_running_loop()
-        
-        async with websockets.serve(self._handler, self.host, self.port):
+
+        async with websockets.serve(self._handler, self.host, self.port, process_request=self._process_request):
             print(f"✅ WebSocket Server active")
             await asyncio.Future()  # Run forever
 
+    def _process_request(self, connection, request):
+        """Serves the metrics page instead of a WebSocket handshake; other paths upgrade as usual."""
+        if not self.metrics_provider or request.path.split("?")[0] != self.metrics_path:
+            return None
+        try:
+            return connection.respond(http.HTTPStatus.OK, self.metrics_provider())
+        except Exception as e:
+            return connection.respond(http.HTTPStatus.INTERNAL_SERVER_ERROR, f"metrics error: {e}\n")
+
     def _start_thread(self):
         """Entry point for the thread."""
         try:
@@ -45,14 +161,67 @@ class WebSocketServer:
         self._thread = Thread(target=self._start_thread, daemon=True)
         self._thread.start()
 
-    async def _broadcast(self, data):
-        if not self.clients:
-            return
-        message = json.dumps(data)
-        # Create tasks for all sends
-        await asyncio.gather(*[client.send(message) for client in self.clients], return_exceptions=True)
+    def _handle_message(self, channel, msg):
+        """
+        Clients opt into the binary feature stream with
+        {"type": "subscribe", "features": "mel"|"mfcc", "format": "uint8"|"float16", "fps": 10}
+        and leave it with {"type": "unsubscribe"}. Anything else is just logged.
+        """
+        try:
+            request = json.loads(msg)
+        except (TypeError, ValueError):
+            request = None
+        kind = request.get("type") if isinstance(request, dict) else None
+
+        if kind == "subscribe":
+            try:
+                subscription = {
+                    "features": request.get("features", "mel"),
+                    "format": request.get("format", "uint8"),
+                    "fps": float(request.get("fps", 10)),
+                }
+            except (TypeError, ValueError):
+                subscription = None
+            if not subscription or subscription["features"] not in ("mel", "mfcc") \
+                    or subscription["format"] not in ("uint8", "float16") or subscription["fps"] <= 0:
+                channel.push(self.encode({"type": "error", "error": "invalid subscription"}), time.monotonic())
+                return
+            channel.subscription = subscription
+            channel.push(self.encode({"type": "subscribed", **subscription}), time.monotonic())
+            print(f"📊 Client subscribed to {subscription['features']} frames at {subscription['fps']:g} fps")
+        elif kind == "unsubscribe":
+            channel.subscription = None
+        else:
+            print(f"📨 Received: {msg}")
+
+    def subscribers(self):
+        """(channel, subscription) for every client subscribed to the feature stream."""
+        return [(c, c.subscription) for c in list(self.clients.values()) if c.subscription]
+
+    def _deliver(self, deliveries):
+        now = time.monotonic()
+        for channel, message in deliveries:
+            channel.push(message, now)
+
+    def send_to(self, deliveries):
+        """Thread-safe: queues each pre-encoded message for its (channel, message) pair."""
+        if deliveries and self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._deliver, deliveries)
+
+    def _fan_out(self, message):
+        """Queues one pre-encoded message for every client. Runs on the server loop, never awaits."""
+        now = time.monotonic()
+        for channel in list(self.clients.values()):
+            channel.push(message, now)
 
     def broadcast_data(self, data):
         """Thread-safe method to send data to all connected clients."""
-        if self.loop and self.loop.is_running():
-            asyncio.run_coroutine_threadsafe(self._broadcast(data), self.loop)
\ No newline at end of file
+        if not self.clients or not (self.loop and self.loop.is_running()):
+            return
+        # Encoded once on the caller's thread, whatever the number of clients
+        message = self.encode(data)
+        self.loop.call_soon_threadsafe(self._fan_out, message)
+
+    def client_stats(self):
+        """Per-client queue depth, sent/dropped counts and queueing lag."""
+        return [channel.stats() for channel in list(self.clients.values())]